@@ -0,0 +1,108 @@
+"""Checkout throughput benchmark against a running API using the fake provider.
+
+Start the API as a single worker with PAYMENT_PROVIDER=fake, then drive
+full checkouts from several concurrent customers: create an order, create
+a checkout session, pay it (the fake provider sends the signed webhook)
+and long-poll until the payment is finalized. Prints per-stage latency
+percentiles and overall checkouts per second.
+
+    PAYMENT_PROVIDER=fake FAKE_PAYMENT_LATENCY_MS=150 uvicorn server:app --port 8001
+    cd backend && python -m benchmarks.checkout_flow --customers 20 --checkouts 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+STAGES = ["create_order", "create_checkout_session", "complete", "finalized"]
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def customer(client: httpx.AsyncClient, service_id: str, checkouts: int, timings: dict, failures: dict):
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/api/auth/register", json={"name": "Bench Customer", "email": email, "password": "bench-password"})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def timed(stage, request):
+        started_at = time.perf_counter()
+        response = await request
+        timings[stage].append((time.perf_counter() - started_at) * 1000)
+        if response.status_code >= 400:
+            failures[stage] = failures.get(stage, 0) + 1
+            return None
+        return response.json()
+
+    for _ in range(checkouts):
+        order = await timed("create_order", client.post(
+            "/api/orders", json={"items": [{"service_id": service_id}]}, headers=headers
+        ))
+        if order is None:
+            continue
+        session = await timed("create_checkout_session", client.post(
+            "/api/payments/create-checkout-session",
+            json={"order_id": order["id"], "origin_url": "http://localhost:3000"},
+            headers=headers
+        ))
+        if session is None:
+            continue
+
+        paid_at = time.perf_counter()
+        if await timed("complete", client.post(f"/api/fake-payments/sessions/{session['session_id']}/complete")) is None:
+            continue
+        status = await client.get(
+            f"/api/payments/checkout-status/{session['session_id']}/wait", params={"timeout": 30}, headers=headers
+        )
+        # From the customer paying to the API reporting the payment
+        timings["finalized"].append((time.perf_counter() - paid_at) * 1000)
+        if status.status_code >= 400 or status.json()["payment_status"] != "paid":
+            failures["finalized"] = failures.get("finalized", 0) + 1
+
+
+async def main(args):
+    timings = {stage: [] for stage in STAGES}
+    failures = {}
+    limits = httpx.Limits(max_connections=args.customers * 2)
+    async with httpx.AsyncClient(base_url=args.api, limits=limits, timeout=60) as client:
+        services = (await client.get("/api/services")).json()
+        if not services:
+            raise SystemExit("No active services to order")
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*[
+            customer(client, services[0]["id"], args.checkouts, timings, failures)
+            for _ in range(args.customers)
+        ])
+        elapsed = time.perf_counter() - started_at
+
+        metrics = await client.get("/api/admin/metrics", headers={"Authorization": f"Bearer {args.admin_token}"}) \
+            if args.admin_token else None
+
+    print(f"{'stage':<24} {'n':>6} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for stage in STAGES:
+        values = timings[stage]
+        if not values:
+            continue
+        print(f"{stage:<24} {len(values):>6} {failures.get(stage, 0):>5} {percentile(values, 0.5):>8.1f} "
+              f"{percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f} {statistics.mean(values):>8.1f}")
+    finalized = len(timings["finalized"]) - failures.get("finalized", 0)
+    print(f"\n{finalized} checkouts finalized in {elapsed:.1f}s ({finalized / elapsed:.1f}/s)")
+    if metrics is not None and metrics.status_code == 200:
+        body = metrics.json()
+        print(f"payment provider: {body.get('payment_provider')}")
+        print(f"webhook inbox: {body.get('webhook_inbox')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://localhost:8001")
+    parser.add_argument("--customers", type=int, default=10, help="Concurrent customers")
+    parser.add_argument("--checkouts", type=int, default=10, help="Checkouts per customer")
+    parser.add_argument("--admin-token", help="Print provider and inbox metrics afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,178 @@
+"""Order listing benchmark: per-order assembly (N+1) vs batched assembly.
+
+Seeds a scratch database with orders, items, users and catalog entries,
+then times both strategies for several page sizes and counts the Mongo
+commands each one issues. The N+1 side is the listing as it was before
+build_order_responses: every order re-read, then its items, services,
+packages and user looked up one order at a time.
+
+    cd backend && python -m benchmarks.order_listing --page-sizes 10 25 50 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+load_dotenv()
+
+import config.database
+from models.order import OrderItemResponse, OrderResponse
+from routes.orders import build_order_responses
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed(db, orders: int, items_per_order: int):
+    await db.client.drop_database(db.name)
+    now = datetime.utcnow()
+
+    services = await db.services.insert_many([
+        {"name": f"Service {i}", "base_price": 100.0 * (i + 1), "active": True, "created_at": now}
+        for i in range(10)
+    ])
+    packages = await db.packages.insert_many([
+        {"name": f"Package {i}", "price": 1000.0 * (i + 1), "active": True, "created_at": now}
+        for i in range(3)
+    ])
+    users = await db.users.insert_many([
+        {"name": f"User {i}", "email": f"user{i}@example.com", "role": "client", "created_at": now}
+        for i in range(max(1, orders // 5))
+    ])
+
+    order_docs = [
+        {
+            "user_id": random.choice(users.inserted_ids),
+            "status": "draft",
+            "subtotal": 0,
+            "tax": 0,
+            "total": 0,
+            "currency": "usd",
+            "created_at": now - timedelta(minutes=i)
+        }
+        for i in range(orders)
+    ]
+    order_ids = (await db.orders.insert_many(order_docs)).inserted_ids
+
+    items = []
+    for order_id in order_ids:
+        for _ in range(items_per_order):
+            if random.random() < 0.8:
+                items.append({"order_id": str(order_id), "service_id": str(random.choice(services.inserted_ids)),
+                              "quantity": 1, "unit_price": 100.0, "line_total": 100.0})
+            else:
+                items.append({"order_id": str(order_id), "package_id": str(random.choice(packages.inserted_ids)),
+                              "quantity": 1, "unit_price": 1000.0, "line_total": 1000.0})
+    await db.order_items.insert_many(items)
+    await db.order_items.create_index("order_id")
+
+
+async def order_with_items(db, order_id: str) -> OrderResponse:
+    """The previous get_order_with_items, kept as the benchmark's baseline"""
+    order = await db.orders.find_one({"_id": ObjectId(order_id)})
+    items = await db.order_items.find({"order_id": order_id}).to_list(100)
+
+    service_ids = [ObjectId(item["service_id"]) for item in items if item.get("service_id")]
+    package_ids = [ObjectId(item["package_id"]) for item in items if item.get("package_id")]
+    services_map = {}
+    packages_map = {}
+    if service_ids:
+        services = await db.services.find({"_id": {"$in": service_ids}}).to_list(100)
+        services_map = {str(s["_id"]): s["name"] for s in services}
+    if package_ids:
+        packages = await db.packages.find({"_id": {"$in": package_ids}}).to_list(100)
+        packages_map = {str(p["_id"]): p["name"] for p in packages}
+
+    user = await db.users.find_one({"_id": order["user_id"]})
+    return OrderResponse(
+        id=str(order["_id"]),
+        user_id=str(order["user_id"]),
+        user_name=user["name"] if user else None,
+        user_email=user["email"] if user else None,
+        status=order["status"],
+        items=[
+            OrderItemResponse(
+                id=str(item["_id"]),
+                service_id=item.get("service_id"),
+                package_id=item.get("package_id"),
+                service_name=services_map.get(item.get("service_id")) if item.get("service_id") else None,
+                package_name=packages_map.get(item.get("package_id")) if item.get("package_id") else None,
+                quantity=item["quantity"],
+                unit_price=item["unit_price"],
+                line_total=item["line_total"]
+            )
+            for item in items
+        ],
+        subtotal=order.get("subtotal", 0),
+        tax=order.get("tax", 0),
+        total=order.get("total", 0),
+        currency=order.get("currency", "usd"),
+        notes=order.get("notes"),
+        created_at=order["created_at"]
+    )
+
+
+async def per_order(db, orders):
+    return [await order_with_items(db, str(order["_id"])) for order in orders]
+
+
+async def batched(db, orders):
+    return await build_order_responses(db, orders)
+
+
+async def measure(db, counter, strategy, page_size: int, repeats: int):
+    timings = []
+    commands = 0
+    for _ in range(repeats):
+        before = counter.count
+        started_at = time.perf_counter()
+        orders = await db.orders.find({}).sort("created_at", -1).to_list(page_size)
+        await strategy(db, orders)
+        timings.append((time.perf_counter() - started_at) * 1000)
+        commands = counter.count - before
+    return commands, statistics.median(timings)
+
+
+async def main(args):
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"], event_listeners=[counter])
+    db = client[args.db]
+    # Item names come from the catalog snapshot, which reads through get_db()
+    config.database.db = db
+    try:
+        await seed(db, max(args.page_sizes), args.items_per_order)
+        print(f"{'page':>6} {'N+1 cmds':>9} {'N+1 ms':>9} {'batch cmds':>11} {'batch ms':>9}")
+        for page_size in args.page_sizes:
+            n1_cmds, n1_ms = await measure(db, counter, per_order, page_size, args.repeats)
+            b_cmds, b_ms = await measure(db, counter, batched, page_size, args.repeats)
+            print(f"{page_size:>6} {n1_cmds:>9} {n1_ms:>9.1f} {b_cmds:>11} {b_ms:>9.1f}")
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 25, 50, 100])
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--db", default="ccc_bench_orders", help="Scratch database (dropped afterwards)")
+    asyncio.run(main(parser.parse_args()))
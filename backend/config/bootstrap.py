@@ -0,0 +1,120 @@
+"""Leader-elected, idempotent startup work shared by all workers.
+
+Index sync and seeding only need to happen once per deployment, not once per
+worker boot. The first worker to take the `startup` lease in the `locks`
+collection runs every startup task concurrently and records the resulting
+version in `startup_state`; the others wait for that record. Subsequent
+boots with an unchanged version cost a single find_one. The leader renews
+its lease while the tasks run; if they fail, it records the error on the
+lease so the waiting workers fail too instead of timing out silently.
+"""
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire_lease(db, name: str, ttl_seconds: int, owner: str = WORKER_ID) -> bool:
+    """Take (or renew) a named lease; False if another live owner holds it"""
+    now = datetime.utcnow()
+    try:
+        await db.locks.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The lease document exists and is held by someone else
+        return False
+
+
+async def release_lease(db, name: str, owner: str = WORKER_ID):
+    await db.locks.delete_one({"_id": name, "owner": owner})
+
+
+async def renew_lease(db, name: str, ttl_seconds: int, owner: str = WORKER_ID):
+    """Heartbeat: keep renewing a held lease until cancelled"""
+    while True:
+        await asyncio.sleep(ttl_seconds / 3)
+        try:
+            if not await acquire_lease(db, name, ttl_seconds, owner):
+                logger.error(f"Lost the {name} lease to another worker")
+                return
+        except Exception as e:
+            logger.warning(f"Renewing the {name} lease failed: {e}")
+
+
+class StartupFailed(Exception):
+    """The startup tasks failed, in this worker or in the one running them"""
+
+
+async def run_startup(
+    db,
+    version: str,
+    tasks: list,
+    lock_ttl_seconds: int = 60,
+    poll_seconds: float = 0.5
+) -> str:
+    """Make sure the startup tasks have run for `version`.
+
+    Returns "current" if they already had, "leader" if this worker ran them,
+    or "follower" if another worker did while we waited. If the leader dies,
+    its lease expires and a waiting worker takes over. If the tasks raise,
+    the leader and every worker waiting on it raise StartupFailed; workers
+    booting later try again.
+    """
+    waited = False
+    began_at = datetime.utcnow()
+
+    while True:
+        state = await db.startup_state.find_one({"_id": "startup"})
+        if state and state.get("version") == version:
+            return "follower" if waited else "current"
+
+        # The leader we were waiting for failed: fail too rather than retry it here
+        lease = await db.locks.find_one({"_id": "startup"})
+        if waited and lease and lease.get("error") and lease["failed_at"] >= began_at:
+            raise StartupFailed(f"Startup tasks failed on {lease['owner']}: {lease['error']}")
+
+        if await acquire_lease(db, "startup", lock_ttl_seconds):
+            heartbeat = asyncio.create_task(renew_lease(db, "startup", lock_ttl_seconds))
+            try:
+                started_at = time.perf_counter()
+                await asyncio.gather(*[task(db) for task in tasks])
+                await db.startup_state.update_one(
+                    {"_id": "startup"},
+                    {"$set": {"version": version, "completed_at": datetime.utcnow(), "worker": WORKER_ID}},
+                    upsert=True
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.exception(f"Startup tasks failed: {error}")
+                # Leave the lease expired with the error on it for the waiting workers
+                await db.locks.update_one(
+                    {"_id": "startup", "owner": WORKER_ID},
+                    {"$set": {"expires_at": datetime.utcnow(), "error": error, "failed_at": datetime.utcnow()}}
+                )
+                raise StartupFailed(error) from e
+            except BaseException:
+                # Cancelled (shutdown): let someone else take over right away
+                await release_lease(db, "startup")
+                raise
+            finally:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+            await release_lease(db, "startup")
+            logger.info(f"Startup tasks completed in {time.perf_counter() - started_at:.2f}s")
+            return "leader"
+
+        waited = True
+        await asyncio.sleep(poll_seconds)
@@ -1,29 +1,62 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import logging
 from dotenv import load_dotenv
+from config.settings import settings
+from config.indexes import sync_indexes
+from services.db_profiler import db_profiler
+from services.pool_monitor import pool_monitor
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME", "ccc_db")
 
 client = None
 db = None
 
+def client_options() -> dict:
+    """Motor client keyword arguments built from settings"""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "retryReads": settings.MONGO_RETRY_READS,
+        "retryWrites": settings.MONGO_RETRY_WRITES,
+        "event_listeners": [db_profiler, pool_monitor]
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        # zstd and snappy need the zstandard / python-snappy packages installed
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
+def create_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(MONGO_URL, **client_options())
+
 async def connect_db():
     global client, db
-    client = AsyncIOMotorClient(MONGO_URL)
+    client = create_client()
     db = client[DB_NAME]
-    # Create indexes
-    await db.users.create_index("email", unique=True)
-    await db.services.create_index("name")
-    await db.orders.create_index("user_id")
-    await db.projects.create_index("user_id")
-    await db.threads.create_index("user_id")
-    await db.payment_transactions.create_index("session_id", unique=True)
     print("Connected to MongoDB")
     return db
 
+async def ensure_indexes(db):
+    """Startup task: create indexes declared in config/indexes.py"""
+    # Reset tokens are stored hashed; records from before that have no expiry and are dropped
+    await db.password_resets.delete_many({"token_hash": {"$exists": False}})
+    # Login attempts are window counters now; per-attempt records from before have no expiry
+    await db.login_attempts.delete_many({"key": {"$exists": True}})
+    report = await sync_indexes(db)
+    if report["created"] or report["updated"]:
+        logger.info(f"Indexes created: {report['created']}, updated: {report['updated']}")
+
 async def close_db():
     global client
     if client:
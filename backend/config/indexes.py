@@ -0,0 +1,199 @@
+"""Declarative index registry.
+
+Every collection's indexes are declared here, matched to the filter + sort
+shape of the queries in routes/*. List endpoints page on (sort key, _id) via
+services/pagination.py, so their indexes end with _id. `sync_indexes` reconciles the registry
+with the live database: it creates missing indexes, updates TTL durations
+in place and reports (optionally drops) indexes that are not declared.
+"""
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+import asyncio
+import hashlib
+import logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        # auth.login / register, admin.create_client
+        IndexModel([("email", ASCENDING)], unique=True),
+        # admin.get_users
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # admin.get_users?role=, client_projects.get_all_clients
+        IndexModel([("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    # services and packages are read whole into services/catalog.py
+    "services": [
+        # server.seed_catalog upserts by name
+        IndexModel([("name", ASCENDING)]),
+    ],
+    "packages": [],
+    "orders": [
+        # orders.get_orders (client)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # orders.get_orders (admin), admin.get_dashboard_stats recent orders
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # orders.get_orders?status=, admin.get_dashboard_stats counts
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "order_items": [
+        # Legacy (non-embedded) orders: orders.build_order_responses,
+        # orders.calculate_order_totals, services/order_items.migrate_orders
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+    "coupons": [
+        # services/coupon_cache.py misses (orders.find_coupon), admin coupon endpoints
+        IndexModel([("code", ASCENDING)], unique=True),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], unique=True),
+        # payments.get_payments (client)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # payments.get_payments (admin)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+        # services/payment_sweeper.py
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "projects": [
+        # projects.get_projects (client)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # projects.get_projects (admin)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+    "intakes": [
+        # intake.get_intakes (client)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # intake.get_intakes (admin), admin.get_dashboard_stats recent intakes
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("type", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+    "threads": [
+        # messages.get_threads (client)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # messages.get_threads (admin)
+        IndexModel([("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "messages": [
+        # messages.get_messages
+        IndexModel([("thread_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "files": [
+        # files.get_files (client)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # files.get_files (admin)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+    "portfolio": [
+        # files.get_portfolio
+        IndexModel([("order_index", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "client_projects": [
+        # client_projects.* lookups by owner
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "project_files": [
+        # client_projects.get_project_files
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "password_resets": [
+        IndexModel([("token_hash", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "login_attempts": [
+        # services/login_throttle.py counters, keyed by _id; dropped when their window ends
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "webhook_events": [
+        # services/webhook_inbox.py claims
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        # Processed events are kept for WEBHOOK_RETENTION_DAYS; dead letters stay
+        IndexModel([("completed_at", ASCENDING)], expireAfterSeconds=settings.WEBHOOK_RETENTION_DAYS * 86400),
+    ],
+    "idempotency_keys": [
+        # services/idempotency.py; records live IDEMPOTENCY_TTL_SECONDS
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "token_versions": [
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+}
+
+
+def index_name(model: IndexModel) -> str:
+    return model.document["name"]
+
+
+def registry_fingerprint() -> str:
+    """Stable digest of INDEXES; changes whenever a declaration changes"""
+    declared = sorted(
+        (collection, sorted(repr(sorted(m.document.items())) for m in models))
+        for collection, models in INDEXES.items()
+    )
+    return hashlib.sha1(repr(declared).encode('utf-8')).hexdigest()
+
+
+async def _sync_collection(db, collection: str, models: list, drop_extra: bool, report: dict):
+    existing = await db[collection].index_information()
+    declared = {index_name(m): m for m in models}
+
+    missing = []
+    for name, model in declared.items():
+        info = existing.get(name)
+        if info is None:
+            missing.append(model)
+            continue
+
+        ttl = model.document.get("expireAfterSeconds")
+        if ttl is not None and info.get("expireAfterSeconds") != ttl:
+            # TTL durations can be changed in place
+            await db.command({
+                "collMod": collection,
+                "index": {"keyPattern": model.document["key"], "expireAfterSeconds": ttl}
+            })
+            report["updated"].append(f"{collection}.{name}")
+        elif bool(info.get("unique")) != bool(model.document.get("unique")):
+            report["conflicts"].append(f"{collection}.{name}")
+
+    if missing:
+        try:
+            await db[collection].create_indexes(missing)
+            report["created"].extend(f"{collection}.{index_name(m)}" for m in missing)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {collection}: {e}")
+            report["conflicts"].extend(f"{collection}.{index_name(m)}" for m in missing)
+
+    for name in existing:
+        if name == "_id_" or name in declared:
+            continue
+        if drop_extra:
+            await db[collection].drop_index(name)
+            report["dropped"].append(f"{collection}.{name}")
+        else:
+            report["extra"].append(f"{collection}.{name}")
+
+
+async def sync_indexes(db, drop_extra: bool = False) -> dict:
+    """Bring the live database in line with INDEXES; returns what changed"""
+    report = {"created": [], "updated": [], "extra": [], "dropped": [], "conflicts": []}
+
+    # Undeclared collections are checked too so stray indexes get reported
+    collections = set(INDEXES) | set(await db.list_collection_names())
+    await asyncio.gather(*[
+        _sync_collection(db, name, INDEXES.get(name, []), drop_extra, report)
+        for name in sorted(collections)
+        if not name.startswith("system.")
+    ])
+
+    for name in report["extra"]:
+        logger.warning(f"Index {name} is not declared in config/indexes.py")
+    for name in report["conflicts"]:
+        logger.warning(f"Index {name} differs from its declaration in config/indexes.py")
+    return report
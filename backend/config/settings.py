@@ -4,12 +4,97 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings:
+    # MongoDB client (see config/database.py); 0 / empty leaves the driver default
+    MONGO_MAX_POOL_SIZE: int = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+    # Comma-separated wire compressors in preference order: zstd, snappy, zlib
+    MONGO_COMPRESSORS: str = os.environ.get("MONGO_COMPRESSORS", "")
+    MONGO_RETRY_READS: bool = os.environ.get("MONGO_RETRY_READS", "true").lower() == "true"
+    MONGO_RETRY_WRITES: bool = os.environ.get("MONGO_RETRY_WRITES", "true").lower() == "true"
     JWT_SECRET: str = os.environ.get("JWT_SECRET", "default_secret")
     JWT_EXPIRATION_HOURS: int = int(os.environ.get("JWT_EXPIRATION_HOURS", "24"))
+    # Embed identity claims + token version in JWTs so auth skips the users lookup
+    JWT_STATELESS_CLAIMS: bool = os.environ.get("JWT_STATELESS_CLAIMS", "false").lower() == "true"
+    TOKEN_VERSION_REFRESH_SECONDS: int = int(os.environ.get("TOKEN_VERSION_REFRESH_SECONDS", "30"))
     STRIPE_API_KEY: str = os.environ.get("STRIPE_API_KEY", "")
     STRIPE_WEBHOOK_SECRET: str = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
+    # Pending payment reconciliation (see services/payment_sweeper.py); interval 0 disables it
+    PAYMENT_SWEEP_INTERVAL_SECONDS: float = float(os.environ.get("PAYMENT_SWEEP_INTERVAL_SECONDS", "300"))
+    PAYMENT_SWEEP_STALE_SECONDS: float = float(os.environ.get("PAYMENT_SWEEP_STALE_SECONDS", "600"))
+    PAYMENT_SWEEP_BATCH_SIZE: int = int(os.environ.get("PAYMENT_SWEEP_BATCH_SIZE", "200"))
+    PAYMENT_SWEEP_CONCURRENCY: int = int(os.environ.get("PAYMENT_SWEEP_CONCURRENCY", "4"))
+    PAYMENT_SWEEP_RATE_PER_SECOND: float = float(os.environ.get("PAYMENT_SWEEP_RATE_PER_SECOND", "5"))
+    # Public base URL of this API; payment webhook URLs are built from it, never from the Host header
+    PUBLIC_API_URL: str = os.environ.get("PUBLIC_API_URL", "http://localhost:8001")
+    # Checkout status coalescing (see services/checkout_status.py)
+    CHECKOUT_STATUS_CACHE_SECONDS: float = float(os.environ.get("CHECKOUT_STATUS_CACHE_SECONDS", "5"))
+    # How long an unchanged order reuses its open checkout session (see routes/payments.py);
+    # keep it under the provider's session lifetime (24h on Stripe), 0 disables reuse
+    CHECKOUT_SESSION_REUSE_SECONDS: int = int(os.environ.get("CHECKOUT_SESSION_REUSE_SECONDS", "3600"))
+    # Webhook inbox workers (see services/webhook_inbox.py)
+    WEBHOOK_WORKERS: int = int(os.environ.get("WEBHOOK_WORKERS", "4"))
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "8"))
+    WEBHOOK_RETRY_BASE_SECONDS: float = float(os.environ.get("WEBHOOK_RETRY_BASE_SECONDS", "5"))
+    WEBHOOK_LEASE_SECONDS: float = float(os.environ.get("WEBHOOK_LEASE_SECONDS", "60"))
+    WEBHOOK_POLL_SECONDS: float = float(os.environ.get("WEBHOOK_POLL_SECONDS", "5"))
+    WEBHOOK_RETENTION_DAYS: int = int(os.environ.get("WEBHOOK_RETENTION_DAYS", "30"))
+    # Stripe HTTP client (see services/payment_provider.py)
+    STRIPE_TIMEOUT_SECONDS: float = float(os.environ.get("STRIPE_TIMEOUT_SECONDS", "10"))
+    STRIPE_MAX_NETWORK_RETRIES: int = int(os.environ.get("STRIPE_MAX_NETWORK_RETRIES", "2"))
+    STRIPE_POOL_SIZE: int = int(os.environ.get("STRIPE_POOL_SIZE", "10"))
+    # "stripe" or "fake" (see services/payment_provider.py)
+    PAYMENT_PROVIDER: str = os.environ.get("PAYMENT_PROVIDER", "stripe")
+    # Simulated provider behaviour (see services/fake_payment_provider.py)
+    FAKE_PAYMENT_LATENCY_MS: float = float(os.environ.get("FAKE_PAYMENT_LATENCY_MS", "0"))
+    FAKE_PAYMENT_JITTER_MS: float = float(os.environ.get("FAKE_PAYMENT_JITTER_MS", "0"))
+    FAKE_PAYMENT_FAILURE_RATE: float = float(os.environ.get("FAKE_PAYMENT_FAILURE_RATE", "0"))
     CLOUDINARY_CLOUD_NAME: str = os.environ.get("CLOUDINARY_CLOUD_NAME", "")
     CLOUDINARY_API_KEY: str = os.environ.get("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.environ.get("CLOUDINARY_API_SECRET", "")
+    # Leader-elected startup (see config/bootstrap.py)
+    STARTUP_LOCK_TTL_SECONDS: int = int(os.environ.get("STARTUP_LOCK_TTL_SECONDS", "60"))
+    STARTUP_WAIT_TIMEOUT_SECONDS: float = float(os.environ.get("STARTUP_WAIT_TIMEOUT_SECONDS", "30"))
+    # Authenticated identity cache (see services/user_cache.py)
+    USER_CACHE_TTL_SECONDS: int = int(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_ENTRIES: int = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+    # bcrypt work factor; pick it with `python manage.py calibrate-bcrypt`
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+    # bcrypt thread pool (see services/password_hasher.py)
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "32"))
+    # Login throttling (see services/login_throttle.py); backend is "memory" or "mongo"
+    LOGIN_THROTTLE_BACKEND: str = os.environ.get("LOGIN_THROTTLE_BACKEND", "memory")
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = int(os.environ.get("LOGIN_THROTTLE_WINDOW_SECONDS", "300"))
+    LOGIN_THROTTLE_MAX_PER_EMAIL: int = int(os.environ.get("LOGIN_THROTTLE_MAX_PER_EMAIL", "10"))
+    LOGIN_THROTTLE_MAX_PER_IP: int = int(os.environ.get("LOGIN_THROTTLE_MAX_PER_IP", "50"))
+    # Mongo command profiling (see services/db_profiler.py)
+    DB_PROFILING_ENABLED: bool = os.environ.get("DB_PROFILING_ENABLED", "true").lower() == "true"
+    DB_SLOW_QUERY_MS: float = float(os.environ.get("DB_SLOW_QUERY_MS", "100"))
+    DB_SLOW_QUERY_EXPLAIN: bool = os.environ.get("DB_SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+    # Per-route reply byte totals; costs a second BSON encode of every reply
+    DB_PROFILE_REPLY_BYTES: bool = os.environ.get("DB_PROFILE_REPLY_BYTES", "false").lower() == "true"
+    # Seconds between catalog version checks (see services/catalog.py)
+    CATALOG_CHECK_SECONDS: float = float(os.environ.get("CATALOG_CHECK_SECONDS", "5"))
+    # Coupon lookups (see services/coupon_cache.py)
+    COUPON_CACHE_TTL_SECONDS: int = int(os.environ.get("COUPON_CACHE_TTL_SECONDS", "60"))
+    COUPON_NEGATIVE_TTL_SECONDS: int = int(os.environ.get("COUPON_NEGATIVE_TTL_SECONDS", "10"))
+    COUPON_CACHE_MAX_ENTRIES: int = int(os.environ.get("COUPON_CACHE_MAX_ENTRIES", "10000"))
+    # Keep order line items inside the order document (see services/order_items.py)
+    ORDER_ITEMS_EMBEDDED: bool = os.environ.get("ORDER_ITEMS_EMBEDDED", "false").lower() == "true"
+    # Idempotency-Key handling (see services/idempotency.py)
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_LOCK_SECONDS: float = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = int(os.environ.get("IDEMPOTENCY_CACHE_MAX_ENTRIES", "10000"))
+    # Larger responses are not stored; retries of them run again
+    IDEMPOTENCY_MAX_BODY_BYTES: int = int(os.environ.get("IDEMPOTENCY_MAX_BODY_BYTES", "1048576"))
+    PASSWORD_RESET_TTL_MINUTES: int = int(os.environ.get("PASSWORD_RESET_TTL_MINUTES", "60"))
+    # Number of reverse proxies in front of the API that append to X-Forwarded-For; with 0 the
+    # header is client-controlled and ignored, and the socket peer address is used
+    TRUSTED_PROXY_HOPS: int = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
 
 settings = Settings()
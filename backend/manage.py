@@ -0,0 +1,123 @@
+"""Operational commands for the CCC backend.
+
+Run from the backend directory, e.g. `python manage.py calibrate-bcrypt --write`.
+"""
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+
+def set_env_value(key: str, value: str, path: str = ENV_FILE):
+    """Create or replace KEY=value in the backend .env file read by config.settings"""
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+    entry = f"{key}={value}"
+    for i, line in enumerate(lines):
+        if line.split("=", 1)[0].strip() == key:
+            lines[i] = entry
+            break
+    else:
+        lines.append(entry)
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def calibrate_bcrypt(args):
+    from services.password_hasher import calibrate_rounds
+
+    chosen, timings = calibrate_rounds(
+        args.target_ms,
+        min_rounds=args.min_rounds,
+        max_rounds=args.max_rounds,
+        samples=args.samples
+    )
+    for rounds, elapsed_ms in timings.items():
+        print(f"  rounds={rounds:<3} median={elapsed_ms:8.1f} ms")
+    print(f"Chosen BCRYPT_ROUNDS={chosen} (target {args.target_ms:.0f} ms per hash)")
+
+    if args.write:
+        set_env_value("BCRYPT_ROUNDS", str(chosen))
+        print(f"Wrote BCRYPT_ROUNDS={chosen} to {ENV_FILE}")
+
+
+def sync_indexes(args):
+    from config.database import create_client, DB_NAME
+    from config.indexes import sync_indexes as reconcile
+
+    async def run():
+        client = create_client()
+        try:
+            return await reconcile(client[DB_NAME], drop_extra=args.drop_extra)
+        finally:
+            client.close()
+
+    report = asyncio.run(run())
+    for action in ("created", "updated", "dropped", "extra", "conflicts"):
+        for name in sorted(report[action]):
+            print(f"  {action:<9} {name}")
+    if not any(report.values()):
+        print("Indexes are in sync")
+
+
+def migrate_order_items(args):
+    from config.database import create_client, DB_NAME
+    from services.order_items import migrate_all
+
+    async def run():
+        client = create_client()
+        try:
+            return await migrate_all(client[DB_NAME], batch_size=args.batch_size, purge=args.purge)
+        finally:
+            client.close()
+
+    result = asyncio.run(run())
+    print(f"Embedded items into {result['migrated']} orders")
+    if args.purge:
+        print(f"Deleted {result['purged']} migrated order_items rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate = commands.add_parser(
+        "calibrate-bcrypt",
+        help="Benchmark bcrypt work factors on this host and pick BCRYPT_ROUNDS"
+    )
+    calibrate.add_argument("--target-ms", type=float, default=250.0, help="Latency budget for one hash")
+    calibrate.add_argument("--min-rounds", type=int, default=10)
+    calibrate.add_argument("--max-rounds", type=int, default=14)
+    calibrate.add_argument("--samples", type=int, default=3)
+    calibrate.add_argument("--write", action="store_true", help="Record the chosen cost in backend/.env")
+    calibrate.set_defaults(func=calibrate_bcrypt)
+
+    indexes = commands.add_parser(
+        "sync-indexes",
+        help="Create indexes declared in config/indexes.py and report undeclared ones"
+    )
+    indexes.add_argument("--drop-extra", action="store_true", help="Drop indexes that are not declared")
+    indexes.set_defaults(func=sync_indexes)
+
+    migrate = commands.add_parser(
+        "migrate-order-items",
+        help="Move order_items rows into their orders (see services/order_items.py)"
+    )
+    migrate.add_argument("--batch-size", type=int, default=500)
+    migrate.add_argument("--purge", action="store_true", help="Delete order_items rows of migrated orders")
+    migrate.set_defaults(func=migrate_order_items)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
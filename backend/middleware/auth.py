@@ -3,18 +3,36 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional
-import bcrypt
 from config.settings import settings
 from config.database import get_db
 from models.user import UserRole
+from services.user_cache import user_cache
+from services.password_hasher import password_hasher
+from services.token_versions import token_versions
 
 security = HTTPBearer(auto_error=False)
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    return await password_hasher.verify(password, hashed)
+
+async def rehash_password_if_needed(user: dict, password: str):
+    """Upgrade a stored hash to the configured work factor after a successful login"""
+    if not password_hasher.needs_rehash(user["password_hash"]):
+        return
+    try:
+        new_hash = await hash_password(password)
+    except HTTPException:
+        # Hasher is saturated; try again on the next login
+        return
+    db = get_db()
+    # Only replace the hash we verified against, in case the password changed meanwhile
+    await db.users.update_one(
+        {"_id": user["_id"], "password_hash": user["password_hash"]},
+        {"$set": {"password_hash": new_hash}}
+    )
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -22,6 +40,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
 
+async def create_user_token(user: dict) -> str:
+    """Issue an access token for a user document"""
+    user_id = str(user["_id"])
+    claims = {"sub": user_id, "role": user["role"]}
+    if settings.JWT_STATELESS_CLAIMS:
+        claims.update({
+            "email": user["email"],
+            "name": user["name"],
+            "phone": user.get("phone"),
+            # From Mongo, not the mirror: a stale version would be rejected by workers that saw the bump
+            "ver": await token_versions.fetch(user_id)
+        })
+    return create_access_token(claims)
+
 def decode_token(token: str) -> dict:
     try:
         return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
@@ -37,19 +69,53 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    # Stateless fast path: identity comes from the token, revocation from token_versions
+    if settings.JWT_STATELESS_CLAIMS and "ver" in payload:
+        if payload["role"] == UserRole.ADMIN:
+            # The mirror may lag a demotion on another worker; admin tokens are checked in Mongo
+            current = payload["ver"] == await token_versions.fetch(user_id)
+        else:
+            current = await token_versions.is_current(user_id, payload["ver"])
+        if not current:
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return {
+            "id": user_id,
+            "email": payload["email"],
+            "name": payload["name"],
+            "role": payload["role"],
+            "phone": payload.get("phone")
+        }
+    
+    version = await token_versions.get(user_id)
+    identity = user_cache.get(user_id, version)
+    if identity is not None:
+        return dict(identity)
+    
     db = get_db()
     from bson import ObjectId
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one(
+        {"_id": ObjectId(user_id)},
+        {"email": 1, "name": 1, "role": 1, "phone": 1}
+    )
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return {
+    identity = {
         "id": str(user["_id"]),
         "email": user["email"],
         "name": user["name"],
         "role": user["role"],
         "phone": user.get("phone")
     }
+    # Admin identities are never cached, so a demotion takes effect on every worker at once
+    if identity["role"] != UserRole.ADMIN:
+        user_cache.set(user_id, identity, version)
+    return dict(identity)
+
+async def invalidate_user(user_id: str):
+    """Drop cached identity and revoke issued tokens after a role change, password change or delete"""
+    user_cache.invalidate(str(user_id))
+    await token_versions.bump(str(user_id))
 
 async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
@@ -0,0 +1,133 @@
+from typing import Optional
+from fastapi import HTTPException
+import hashlib
+import json
+from config.settings import settings
+from middleware.auth import decode_token
+from services.idempotency import idempotency_store, record_id, IdempotencyConflict
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Responses here carry credentials (tokens), which must not be stored
+EXCLUDED_PREFIXES = ("/api/auth/",)
+
+
+def token_subject(authorization: bytes) -> Optional[str]:
+    """User id from a valid bearer token, else None"""
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token).get("sub")
+    except HTTPException:
+        return None
+
+
+async def send_json(send, status_code: int, content: dict):
+    body = json.dumps(content).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that runs a mutating request at most once per Idempotency-Key.
+
+    Requests without the header, without a valid bearer token or under
+    EXCLUDED_PREFIXES pass straight through; keys are scoped to the token's
+    user. The first request with a key runs normally while its response is
+    captured; responses below 500 (other than 429) are stored in
+    services/idempotency.py and replayed, with an Idempotent-Replayed
+    header, to every retry. Server errors release the key so a retry runs
+    again.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS or scope["path"].startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER.lower().encode())
+        user_id = token_subject(headers.get(b"authorization", b"")) if key is not None else None
+        if user_id is None:
+            # Anonymous callers would all share one key space; the route rejects them anyway
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await send_json(send, 400, {"detail": f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"})
+            return
+
+        # The body is hashed to tell a retry from a different request reusing the key
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        key_id = record_id(user_id, scope["method"], scope["path"], key)
+        try:
+            stored = await idempotency_store.claim(key_id, hashlib.sha256(body).hexdigest())
+        except IdempotencyConflict as e:
+            await send_json(send, e.status_code, {"detail": e.detail})
+            return
+
+        if stored is not None:
+            await send({
+                "type": "http.response.start",
+                "status": stored["status_code"],
+                "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored["headers"]]
+                + [(REPLAYED_HEADER.lower().encode(), b"true")]
+            })
+            await send({"type": "http.response.body", "body": stored["body"]})
+            return
+
+        await self._execute(scope, receive, send, body, key_id)
+
+    async def _execute(self, scope, receive, send, body: bytes, key_id: str):
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": [], "size": 0}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+                if response["size"] <= settings.IDEMPOTENCY_MAX_BODY_BYTES:
+                    response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await idempotency_store.release(key_id)
+            raise
+
+        status = response["status"]
+        if status is None or status >= 500 or status == 429 or response["size"] > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            await idempotency_store.release(key_id)
+        else:
+            await idempotency_store.complete(key_id, status, response["headers"], b"".join(response["body"]))
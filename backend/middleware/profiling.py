@@ -0,0 +1,25 @@
+from services.db_profiler import db_profiler, current_request, RequestProfile
+
+
+class DbProfilingMiddleware:
+    """ASGI middleware that tags Mongo commands with the route that issued them.
+
+    Pure ASGI rather than BaseHTTPMiddleware so the router's scope updates
+    (the matched endpoint) are visible to the command listener.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not db_profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = current_request.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+            db_profiler.request_finished(profile)
@@ -17,6 +17,23 @@ class OrderItemCreate(BaseModel):
     package_id: Optional[str] = None
     quantity: int = Field(default=1, ge=1)
 
+class OrderItemOp(str, Enum):
+    ADD = "add"
+    REMOVE = "remove"
+    SET_QUANTITY = "set_quantity"
+
+class OrderItemOperation(BaseModel):
+    op: OrderItemOp
+    # add
+    service_id: Optional[str] = None
+    package_id: Optional[str] = None
+    # remove / set_quantity
+    item_id: Optional[str] = None
+    quantity: int = Field(default=1, ge=1)
+
+class OrderItemBatch(BaseModel):
+    operations: List[OrderItemOperation] = Field(..., min_length=1, max_length=100)
+
 class OrderItemResponse(BaseModel):
     id: str
     service_id: Optional[str] = None
@@ -29,6 +46,8 @@ class OrderItemResponse(BaseModel):
 
 class OrderCreate(BaseModel):
     notes: Optional[str] = None
+    # Optional initial line items, written together with the order
+    items: Optional[List[OrderItemCreate]] = Field(default=None, max_length=100)
 
 class OrderUpdate(BaseModel):
     notes: Optional[str] = None
@@ -50,3 +69,16 @@ class OrderResponse(BaseModel):
 
 class ApplyCouponRequest(BaseModel):
     code: str
+
+class OrderQuoteRequest(BaseModel):
+    items: List[OrderItemCreate] = Field(..., min_length=1, max_length=100)
+    coupon_code: Optional[str] = None
+
+class OrderQuoteResponse(BaseModel):
+    items: List[OrderItemResponse]
+    subtotal: float
+    discount: float = 0.0
+    tax: float = 0.0
+    total: float
+    currency: str = "usd"
+    coupon_code: Optional[str] = None
@@ -40,3 +40,30 @@ class CreateCheckoutRequest(BaseModel):
 class CheckoutResponse(BaseModel):
     url: str
     session_id: str
+
+# Provider-neutral shapes used by services/payment_provider.py
+
+class ProviderCheckoutRequest(BaseModel):
+    amount: float
+    currency: str = "usd"
+    success_url: str
+    cancel_url: str
+    metadata: Dict[str, str] = {}
+
+class ProviderCheckoutSession(BaseModel):
+    session_id: str
+    url: str
+
+class ProviderCheckoutStatus(BaseModel):
+    status: str
+    payment_status: str
+    amount_total: int  # In cents
+    currency: str
+    metadata: Dict[str, str] = {}
+
+class ProviderWebhookEvent(BaseModel):
+    event_id: str
+    event_type: str
+    session_id: Optional[str] = None
+    payment_status: Optional[str] = None
+    metadata: Dict[str, str] = {}
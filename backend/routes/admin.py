@@ -1,11 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from config.database import get_db
-from middleware.auth import require_admin, hash_password
+from middleware.auth import require_admin, hash_password, invalidate_user
 from models.user import UserResponse, UserRole
+from services.user_cache import user_cache
+from services.pagination import paginate
+from services.password_hasher import password_hasher
+from services.token_versions import token_versions
+from services.catalog import catalog
+from services.coupon_cache import coupon_cache
+from services.login_throttle import login_throttle
+from services.db_profiler import db_profiler
+from services.pool_monitor import pool_monitor
+from services.payment_provider import payment_provider
+from services.webhook_inbox import webhook_inbox
+from services.idempotency import idempotency_store
+from services.checkout_status import checkout_status_cache
+from services.payment_sweeper import payment_sweeper
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -28,7 +44,7 @@ async def create_client(request: CreateClientRequest, admin: dict = Depends(requ
     user_doc = {
         "name": request.name,
         "email": request.email,
-        "password_hash": hash_password(request.password),
+        "password_hash": await hash_password(request.password),
         "role": "client",
         "phone": None,
         "created_at": datetime.utcnow(),
@@ -62,6 +78,7 @@ async def delete_user(user_id: str, admin: dict = Depends(require_admin)):
     
     # Delete the user
     await db.users.delete_one({"_id": ObjectId(user_id)})
+    await invalidate_user(user_id)
     
     # Also delete related data (optional: intakes, orders, etc.)
     await db.intakes.delete_many({"user_id": user_id})
@@ -71,8 +88,11 @@ async def delete_user(user_id: str, admin: dict = Depends(require_admin)):
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     search: Optional[str] = None,
     role: Optional[UserRole] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     admin: dict = Depends(require_admin)
 ):
     """Get all users (admin only)"""
@@ -87,7 +107,7 @@ async def get_users(
             {"email": {"$regex": search, "$options": "i"}}
         ]
     
-    users = await db.users.find(query).sort("created_at", -1).to_list(100)
+    users = await paginate(db.users, query, "created_at", -1, limit, cursor, response, {"password_hash": 0})
     
     return [
         UserResponse(
@@ -132,8 +152,133 @@ async def update_user_role(user_id: str, role: UserRole, admin: dict = Depends(r
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await invalidate_user(user_id)
+    
     return {"message": f"User role updated to {role}"}
 
+class CouponCreate(BaseModel):
+    code: str = Field(..., min_length=1, max_length=50)
+    type: str = Field(..., pattern="^(percent|fixed)$")
+    value: float = Field(..., gt=0)
+    active: bool = True
+    expires_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_percent(self):
+        if self.type == "percent" and self.value > 100:
+            raise ValueError("A percent coupon's value cannot exceed 100")
+        return self
+
+class CouponUpdate(BaseModel):
+    value: Optional[float] = Field(default=None, gt=0)
+    active: Optional[bool] = None
+    expires_at: Optional[datetime] = None
+
+def coupon_response(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "code": doc["code"],
+        "type": doc["type"],
+        "value": doc["value"],
+        "active": doc.get("active", False),
+        "expires_at": doc.get("expires_at"),
+        "created_at": doc.get("created_at")
+    }
+
+@router.get("/coupons")
+async def get_coupons(admin: dict = Depends(require_admin)):
+    """List all coupons (admin only)"""
+    db = get_db()
+    coupons = await db.coupons.find().sort("code", 1).to_list(1000)
+    return [coupon_response(c) for c in coupons]
+
+@router.post("/coupons")
+async def create_coupon(coupon: CouponCreate, admin: dict = Depends(require_admin)):
+    """Create a coupon (admin only)"""
+    db = get_db()
+    coupon_doc = {
+        **coupon.model_dump(),
+        "code": coupon.code.upper(),
+        "created_at": datetime.utcnow()
+    }
+    try:
+        result = await db.coupons.insert_one(coupon_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Coupon code already exists")
+    await coupon_cache.bump()
+    coupon_doc["_id"] = result.inserted_id
+    return coupon_response(coupon_doc)
+
+@router.patch("/coupons/{code}")
+async def update_coupon(code: str, update: CouponUpdate, admin: dict = Depends(require_admin)):
+    """Update a coupon's value, active flag or expiry (admin only)"""
+    db = get_db()
+    update_data = update.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No update data provided")
+    
+    query = {"code": code.upper()}
+    if update_data.get("value") is not None and update_data["value"] > 100:
+        # Only fixed coupons may go above 100; the type is on the stored coupon
+        query["type"] = {"$ne": "percent"}
+    result = await db.coupons.find_one_and_update(
+        query,
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    if not result:
+        if "type" in query and await db.coupons.find_one({"code": code.upper()}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="A percent coupon's value cannot exceed 100")
+        raise HTTPException(status_code=404, detail="Coupon not found")
+    await coupon_cache.bump()
+    return coupon_response(result)
+
+@router.delete("/coupons/{code}")
+async def delete_coupon(code: str, admin: dict = Depends(require_admin)):
+    """Delete a coupon (admin only)"""
+    db = get_db()
+    result = await db.coupons.delete_one({"code": code.upper()})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Coupon not found")
+    await coupon_cache.bump()
+    return {"message": "Coupon deleted successfully"}
+
+@router.get("/webhooks/dead")
+async def get_dead_webhooks(admin: dict = Depends(require_admin)):
+    """Webhook events that exhausted their retries (admin only)"""
+    db = get_db()
+    events = await db.webhook_events.find(
+        {"status": "dead"},
+        {"payload": 0}
+    ).sort("failed_at", -1).to_list(100)
+    return events
+
+@router.post("/webhooks/{event_id}/redrive")
+async def redrive_webhook(event_id: str, admin: dict = Depends(require_admin)):
+    """Queue a dead-lettered webhook event for processing again (admin only)"""
+    if not await webhook_inbox.redrive(event_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered event not found")
+    return {"message": "Event queued"}
+
+@router.get("/metrics")
+async def get_metrics(admin: dict = Depends(require_admin)):
+    """In-process cache and performance counters for this worker (admin only)"""
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_versions": token_versions.stats(),
+        "catalog": catalog.stats(),
+        "coupon_cache": coupon_cache.stats(),
+        "payment_provider": payment_provider.stats(),
+        "webhook_inbox": webhook_inbox.stats(),
+        "idempotency": idempotency_store.stats(),
+        "checkout_status": checkout_status_cache.stats(),
+        "payment_sweeper": payment_sweeper.stats(),
+        "login_throttle": login_throttle.stats(),
+        "db": db_profiler.stats(),
+        "db_pool": pool_monitor.stats()
+    }
+
 @router.get("/stats")
 async def get_dashboard_stats(admin: dict = Depends(require_admin)):
     """Get dashboard statistics (admin only)"""
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
 from bson import ObjectId
 from datetime import datetime
 import os
@@ -7,9 +7,11 @@ from config.database import get_db
 from middleware.auth import (
     hash_password, 
     verify_password, 
-    create_access_token,
+    rehash_password_if_needed,
+    create_user_token,
     get_current_user,
-    decode_token
+    decode_token,
+    invalidate_user
 )
 from models.user import (
     UserCreate, 
@@ -21,7 +23,8 @@ from models.user import (
     ResetPasswordRequest
 )
 from services.email_service import email_service
-import secrets
+from services.login_throttle import login_throttle, client_ip
+from services.password_reset_store import password_reset_store
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -42,7 +45,7 @@ async def register(user_data: UserCreate):
     user_doc = {
         "name": user_data.name,
         "email": user_data.email,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password(user_data.password),
         "role": UserRole.CLIENT,
         "phone": user_data.phone,
         "created_at": datetime.utcnow(),
@@ -53,7 +56,7 @@ async def register(user_data: UserCreate):
     user_id = str(result.inserted_id)
     
     # Generate token
-    token = create_access_token({"sub": user_id, "role": UserRole.CLIENT})
+    token = await create_user_token({**user_doc, "_id": result.inserted_id})
     
     return TokenResponse(
         access_token=token,
@@ -68,15 +71,29 @@ async def register(user_data: UserCreate):
     )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request, background_tasks: BackgroundTasks):
     db = get_db()
     
+    # Reject floods before any user lookup or bcrypt work
+    retry_after = await login_throttle.check(credentials.email, client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_password(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    # Only failed attempts count against the budget
+    await login_throttle.release(credentials.email, client_ip(request))
+    
+    # Bring the stored hash to the current work factor without delaying the response
+    background_tasks.add_task(rehash_password_if_needed, user, credentials.password)
     
     user_id = str(user["_id"])
-    token = create_access_token({"sub": user_id, "role": user["role"]})
+    token = await create_user_token(user)
     
     return TokenResponse(
         access_token=token,
@@ -110,13 +127,7 @@ async def forgot_password(request: ForgotPasswordRequest):
     
     # Always return success to prevent email enumeration
     if user:
-        reset_token = secrets.token_urlsafe(32)
-        await db.password_resets.insert_one({
-            "user_id": user["_id"],
-            "token": reset_token,
-            "created_at": datetime.utcnow(),
-            "used": False
-        })
+        reset_token = await password_reset_store.issue(user["_id"])
         # Send reset email (mock mode)
         frontend_url = os.environ.get("FRONTEND_URL", "https://crowncollective.com")
         await email_service.send_password_reset(
@@ -131,28 +142,28 @@ async def forgot_password(request: ForgotPasswordRequest):
 async def reset_password(request: ResetPasswordRequest):
     db = get_db()
     
-    reset_record = await db.password_resets.find_one({
-        "token": request.token,
-        "used": False
-    })
-    
-    if not reset_record:
+    # Validate and mark the token used in one round trip
+    user_id = await password_reset_store.consume(request.token)
+    if not user_id:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
+    try:
+        password_hash = await hash_password(request.new_password)
+    except HTTPException:
+        # Hasher is saturated; keep the token valid so the user can retry
+        await password_reset_store.release(request.token)
+        raise
+    
     # Update password
     await db.users.update_one(
-        {"_id": reset_record["user_id"]},
+        {"_id": user_id},
         {"$set": {
-            "password_hash": hash_password(request.new_password),
+            "password_hash": password_hash,
             "updated_at": datetime.utcnow()
         }}
     )
     
-    # Mark token as used
-    await db.password_resets.update_one(
-        {"_id": reset_record["_id"]},
-        {"$set": {"used": True}}
-    )
+    await invalidate_user(user_id)
     
     return {"message": "Password reset successful"}
 
@@ -167,16 +178,18 @@ async def change_password(request: ChangePasswordRequest, current_user: dict = D
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not verify_password(request.current_password, user["password_hash"]):
+    if not await verify_password(request.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Update password
     await db.users.update_one(
         {"_id": user["_id"]},
         {"$set": {
-            "password_hash": hash_password(request.new_password),
+            "password_hash": await hash_password(request.new_password),
             "updated_at": datetime.utcnow()
         }}
     )
     
+    await invalidate_user(current_user["id"])
+    
     return {"message": "Password changed successfully"}
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
 from config.database import get_db
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.client_project import (
     ClientProjectCreate, ClientProjectUpdate, ClientProjectResponse,
     ProjectFileCreate, ProjectFileResponse, NextStepItem, ClientOverview
@@ -24,12 +25,17 @@ def require_ccc_admin(current_user: dict = Depends(get_current_user)):
 # ============ ADMIN ENDPOINTS ============
 
 @router.get("/admin/clients", response_model=List[ClientOverview])
-async def get_all_clients(admin: dict = Depends(require_ccc_admin)):
+async def get_all_clients(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(require_ccc_admin)
+):
     """Get all clients with their project status (CCC Admin only)"""
     db = get_db()
     
     # Get all client users
-    users = await db.users.find({"role": "client"}).sort("created_at", -1).to_list(100)
+    users = await paginate(db.users, {"role": "client"}, "created_at", -1, limit, cursor, response, {"password_hash": 0})
     
     result = []
     for user in users:
@@ -301,7 +307,13 @@ async def upload_project_file(
     )
 
 @router.get("/files/{user_id}", response_model=List[ProjectFileResponse])
-async def get_project_files(user_id: str, current_user: dict = Depends(get_current_user)):
+async def get_project_files(
+    user_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """Get all files for a project"""
     db = get_db()
     
@@ -312,7 +324,7 @@ async def get_project_files(user_id: str, current_user: dict = Depends(get_curre
     if not is_admin and not is_owner:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    files = await db.project_files.find({"user_id": user_id}).sort("created_at", -1).to_list(100)
+    files = await paginate(db.project_files, {"user_id": user_id}, "created_at", -1, limit, cursor, response)
     
     result = []
     for f in files:
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from services.payment_provider import payment_provider, ProviderError
+
+# Only mounted when PAYMENT_PROVIDER=fake (see server.py); stands in for the customer on Stripe's page
+router = APIRouter(prefix="/api/fake-payments", tags=["Fake Payments"])
+
+@router.post("/sessions/{session_id}/complete")
+async def complete_session(session_id: str, deliver_webhook: bool = True):
+    """Pay a fake checkout session and send its signed webhook to this API"""
+    try:
+        event = await payment_provider.complete(session_id, deliver_webhook)
+    except ProviderError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"session_id": session_id, "event_id": event["id"]}
+
+@router.post("/sessions/{session_id}/expire")
+async def expire_session(session_id: str, deliver_webhook: bool = True):
+    try:
+        event = await payment_provider.expire(session_id, deliver_webhook)
+    except ProviderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"session_id": session_id, "event_id": event["id"]}
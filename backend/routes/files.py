@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
@@ -10,6 +10,7 @@ import cloudinary.uploader
 from config.database import get_db
 from config.settings import settings
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.file import (
     FileUploadCreate, FileUploadResponse,
     PortfolioItemCreate, PortfolioItemResponse,
@@ -99,8 +100,11 @@ async def register_file_upload(
 
 @router.get("", response_model=List[FileUploadResponse])
 async def get_files(
+    response: Response,
     project_id: Optional[str] = None,
     order_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """Get files - admin gets all, client gets own"""
@@ -114,7 +118,7 @@ async def get_files(
     if order_id:
         query["order_id"] = order_id
     
-    files = await db.files.find(query).sort("created_at", -1).to_list(100)
+    files = await paginate(db.files, query, "created_at", -1, limit, cursor, response)
     
     return [
         FileUploadResponse(
@@ -182,11 +186,15 @@ async def add_portfolio_item(item: PortfolioItemCreate, admin: dict = Depends(re
     )
 
 @router.get("/portfolio", response_model=List[PortfolioItemResponse])
-async def get_portfolio():
+async def get_portfolio(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
+):
     """Get portfolio items (public)"""
     db = get_db()
     
-    items = await db.portfolio.find().sort("order_index", 1).to_list(100)
+    items = await paginate(db.portfolio, {}, "order_index", 1, limit, cursor, response)
     
     return [
         PortfolioItemResponse(
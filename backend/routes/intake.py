@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
 import os
 from config.database import get_db
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.intake import IntakeCreate, IntakeResponse, IntakeType
 from services.email_service import email_service
 
@@ -79,8 +80,11 @@ async def get_intake(intake_id: str, current_user: dict = Depends(get_current_us
 
 @router.get("", response_model=List[IntakeResponse])
 async def get_intakes(
+    response: Response,
     type: Optional[IntakeType] = None,
     order_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
@@ -93,7 +97,7 @@ async def get_intakes(
     if order_id:
         query["order_id"] = order_id
     
-    intakes = await db.intakes.find(query).sort("created_at", -1).to_list(100)
+    intakes = await paginate(db.intakes, query, "created_at", -1, limit, cursor, response)
     
     result = []
     for intake in intakes:
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from config.database import get_db
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.message import (
     ThreadCreate, ThreadResponse,
     MessageCreate, MessageResponse, SenderRole
@@ -39,14 +40,19 @@ async def create_thread(thread: ThreadCreate, current_user: dict = Depends(get_c
     )
 
 @router.get("", response_model=List[ThreadResponse])
-async def get_threads(current_user: dict = Depends(get_current_user)):
+async def get_threads(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     db = get_db()
     
     query = {}
     if current_user["role"] != "admin":
         query["user_id"] = current_user["id"]
     
-    threads = await db.threads.find(query).sort("updated_at", -1).to_list(100)
+    threads = await paginate(db.threads, query, "updated_at", -1, limit, cursor, response)
     
     result = []
     for thread in threads:
@@ -91,7 +97,13 @@ async def get_thread(thread_id: str, current_user: dict = Depends(get_current_us
     )
 
 @router.get("/{thread_id}/messages", response_model=List[MessageResponse])
-async def get_messages(thread_id: str, current_user: dict = Depends(get_current_user)):
+async def get_messages(
+    thread_id: str,
+    response: Response,
+    limit: int = Query(500, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     db = get_db()
     
     thread = await db.threads.find_one({"_id": ObjectId(thread_id)})
@@ -101,7 +113,7 @@ async def get_messages(thread_id: str, current_user: dict = Depends(get_current_
     if thread["user_id"] != current_user["id"] and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    messages = await db.messages.find({"thread_id": thread_id}).sort("created_at", 1).to_list(500)
+    messages = await paginate(db.messages, {"thread_id": thread_id}, "created_at", 1, limit, cursor, response)
     
     result = []
     for msg in messages:
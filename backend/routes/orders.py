@@ -1,28 +1,127 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
+import asyncio
 from config.database import get_db
+from config.settings import settings
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
+from services.catalog import catalog
+from services.coupon_cache import coupon_cache
+from services.order_items import (
+    is_embedded, embedded_item, item_names, load_editable_order, embed_if_enabled, push_item, pull_item, edit_items,
+    price_lookup, apply_operations, write_legacy_items, price_items, order_totals, coupon_discount
+)
 from models.order import (
     OrderCreate, OrderUpdate, OrderResponse, OrderStatus,
-    OrderItemCreate, OrderItemResponse, ApplyCouponRequest
+    OrderItemCreate, OrderItemResponse, OrderItemBatch, ApplyCouponRequest,
+    OrderQuoteRequest, OrderQuoteResponse
 )
 
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
-async def calculate_order_totals(db, order_id: str):
-    """Recalculate order totals based on items"""
-    items = await db.order_items.find({"order_id": order_id}).to_list(100)
-    subtotal = sum(item["line_total"] for item in items)
-    tax = 0  # Can implement tax calculation later
-    total = subtotal + tax
+async def calculate_order_totals(db, order_id: str, coupon_code: Optional[str] = None) -> dict:
+    """Recalculate a legacy order's totals from its order_items rows, keeping or applying a coupon"""
+    if coupon_code is None:
+        order = await db.orders.find_one({"_id": ObjectId(order_id)}, {"coupon_code": 1})
+        coupon_code = order.get("coupon_code") if order else None
+    items = await db.order_items.find({"order_id": order_id}).to_list(None)
+    totals = await order_totals(sum(item["line_total"] for item in items), coupon_code)
     
     await db.orders.update_one(
         {"_id": ObjectId(order_id)},
-        {"$set": {"subtotal": subtotal, "tax": tax, "total": total}}
+        {"$set": totals}
     )
-    return subtotal, tax, total
+    return totals
+
+async def find_coupon(code: str) -> dict:
+    """Look up an active, unexpired coupon by code (cached, checks done in memory)"""
+    coupon_doc = await coupon_cache.get(code)
+    
+    if not coupon_doc or not coupon_doc.get("active"):
+        raise HTTPException(status_code=400, detail="Invalid or expired coupon")
+    
+    # Check expiration
+    if coupon_doc.get("expires_at") and coupon_doc["expires_at"] < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Coupon has expired")
+    
+    return coupon_doc
+
+def item_response(item: dict) -> OrderItemResponse:
+    return OrderItemResponse(
+        id=str(item["_id"]),
+        service_id=item.get("service_id"),
+        package_id=item.get("package_id"),
+        service_name=item.get("service_name"),
+        package_name=item.get("package_name"),
+        quantity=item["quantity"],
+        unit_price=item["unit_price"],
+        line_total=item["line_total"]
+    )
+
+async def build_order_responses(db, orders: list, known_users: dict = None) -> List[OrderResponse]:
+    """Assemble OrderResponses for a page of orders in a constant number of queries.
+
+    Embedded orders carry their items and names; only legacy orders need the
+    order_items and name lookups. `known_users` (user _id -> user) skips the
+    owner lookup, e.g. for the current user.
+    """
+    if not orders:
+        return []
+    
+    known_users = known_users or {}
+    legacy_ids = [str(order["_id"]) for order in orders if not is_embedded(order)]
+    user_ids = list({order["user_id"] for order in orders} - set(known_users))
+    
+    async def fetch_rows():
+        if not legacy_ids:
+            return []
+        return await db.order_items.find({"order_id": {"$in": legacy_ids}}).to_list(None)
+    
+    async def fetch_users():
+        if not user_ids:
+            return []
+        return await db.users.find({"_id": {"$in": user_ids}}, {"name": 1, "email": 1}).to_list(None)
+    
+    # Legacy items and owners for the whole page
+    rows, users = await asyncio.gather(fetch_rows(), fetch_users())
+    users_map = {**known_users, **{u["_id"]: u for u in users}}
+    
+    # Names of services and packages referenced by legacy items
+    services_map, packages_map = await item_names(rows)
+    
+    items_by_order = {}
+    for row in rows:
+        items_by_order.setdefault(row["order_id"], []).append({
+            **row,
+            "service_name": services_map.get(row.get("service_id")) if row.get("service_id") else None,
+            "package_name": packages_map.get(row.get("package_id")) if row.get("package_id") else None
+        })
+    
+    result = []
+    for order in orders:
+        user = users_map.get(order["user_id"])
+        items = order["items"] if is_embedded(order) else items_by_order.get(str(order["_id"]), [])
+        result.append(OrderResponse(
+            id=str(order["_id"]),
+            user_id=str(order["user_id"]),
+            user_name=user["name"] if user else None,
+            user_email=user["email"] if user else None,
+            status=order["status"],
+            items=[item_response(item) for item in items],
+            subtotal=order.get("subtotal", 0),
+            tax=order.get("tax", 0),
+            total=order.get("total", 0),
+            currency=order.get("currency", "usd"),
+            notes=order.get("notes"),
+            created_at=order["created_at"]
+        ))
+    
+    return result
+
+def current_user_map(current_user: dict) -> dict:
+    return {ObjectId(current_user["id"]): current_user}
 
 async def get_order_with_items(db, order_id: str, check_user: str = None):
     """Get order with all items"""
@@ -33,56 +132,29 @@ async def get_order_with_items(db, order_id: str, check_user: str = None):
     if check_user and str(order["user_id"]) != check_user:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get items
-    items = await db.order_items.find({"order_id": order_id}).to_list(100)
-    
-    # Batch fetch all services and packages to avoid N+1 queries
-    service_ids = [ObjectId(item["service_id"]) for item in items if item.get("service_id")]
-    package_ids = [ObjectId(item["package_id"]) for item in items if item.get("package_id")]
-    
-    services_map = {}
-    packages_map = {}
-    
-    if service_ids:
-        services = await db.services.find({"_id": {"$in": service_ids}}).to_list(100)
-        services_map = {str(s["_id"]): s["name"] for s in services}
-    
-    if package_ids:
-        packages = await db.packages.find({"_id": {"$in": package_ids}}).to_list(100)
-        packages_map = {str(p["_id"]): p["name"] for p in packages}
-    
-    item_responses = []
-    for item in items:
-        service_name = services_map.get(item.get("service_id")) if item.get("service_id") else None
-        package_name = packages_map.get(item.get("package_id")) if item.get("package_id") else None
-        
-        item_responses.append(OrderItemResponse(
-            id=str(item["_id"]),
-            service_id=item.get("service_id"),
-            package_id=item.get("package_id"),
-            service_name=service_name,
-            package_name=package_name,
-            quantity=item["quantity"],
-            unit_price=item["unit_price"],
-            line_total=item["line_total"]
-        ))
-    
-    # Get user info
-    user = await db.users.find_one({"_id": order["user_id"]})
-    
-    return OrderResponse(
-        id=str(order["_id"]),
-        user_id=str(order["user_id"]),
-        user_name=user["name"] if user else None,
-        user_email=user["email"] if user else None,
-        status=order["status"],
-        items=item_responses,
-        subtotal=order.get("subtotal", 0),
-        tax=order.get("tax", 0),
-        total=order.get("total", 0),
-        currency=order.get("currency", "usd"),
-        notes=order.get("notes"),
-        created_at=order["created_at"]
+    return (await build_order_responses(db, [order]))[0]
+
+@router.post("/quote", response_model=OrderQuoteResponse)
+async def quote_order(request: OrderQuoteRequest):
+    """Price a prospective order from the catalog without writing anything"""
+    items = await price_items(request.items)
+    subtotal = sum(item["line_total"] for item in items)
+    tax = 0  # Same as calculate_order_totals
+    
+    discount = 0
+    coupon_code = None
+    if request.coupon_code:
+        coupon_doc = await find_coupon(request.coupon_code)
+        discount = coupon_discount(coupon_doc, subtotal)
+        coupon_code = coupon_doc["code"]
+    
+    return OrderQuoteResponse(
+        items=[item_response(item) for item in items],
+        subtotal=subtotal,
+        discount=discount,
+        tax=tax,
+        total=subtotal - discount + tax,
+        coupon_code=coupon_code
     )
 
 @router.post("", response_model=OrderResponse)
@@ -98,38 +170,52 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         "notes": order_data.notes,
         "created_at": datetime.utcnow()
     }
+    
+    items = await price_items(order_data.items) if order_data.items else []
+    subtotal = sum(item["line_total"] for item in items)
+    order_doc["subtotal"] = order_doc["total"] = subtotal
+    
+    if settings.ORDER_ITEMS_EMBEDDED:
+        order_doc["items"] = items
+        order_doc["items_revision"] = 0
     result = await db.orders.insert_one(order_doc)
-    order_id = str(result.inserted_id)
-    return await get_order_with_items(db, order_id)
+    order_doc["_id"] = result.inserted_id
+    
+    if not settings.ORDER_ITEMS_EMBEDDED:
+        await write_legacy_items(db, str(result.inserted_id), [], items)
+    return (await build_order_responses(db, [order_doc], current_user_map(current_user)))[0]
 
 @router.post("/{order_id}/items", response_model=OrderResponse)
 async def add_order_item(order_id: str, item: OrderItemCreate, current_user: dict = Depends(get_current_user)):
     db = get_db()
     
-    # Verify order exists and belongs to user
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if str(order["user_id"]) != current_user["id"] and current_user["role"] != "admin":
-        raise HTTPException(status_code=403, detail="Access denied")
-    if order["status"] not in [OrderStatus.DRAFT, OrderStatus.PENDING]:
-        raise HTTPException(status_code=400, detail="Cannot modify this order")
+    # Verify order exists, belongs to user and can still be edited
+    order = await load_editable_order(db, order_id, current_user)
     
-    # Get price from service or package
+    # Get price from service or package (catalog snapshot, no query)
     unit_price = 0
     if item.service_id:
-        service = await db.services.find_one({"_id": ObjectId(item.service_id)})
+        service = await catalog.service(item.service_id)
         if not service:
             raise HTTPException(status_code=404, detail="Service not found")
         unit_price = service["base_price"]
+        name = service["name"]
     elif item.package_id:
-        package = await db.packages.find_one({"_id": ObjectId(item.package_id)})
+        package = await catalog.package(item.package_id)
         if not package:
             raise HTTPException(status_code=404, detail="Package not found")
         unit_price = package["price"]
+        name = package["name"]
     else:
         raise HTTPException(status_code=400, detail="Must provide service_id or package_id")
     
+    if is_embedded(order):
+        # Item and totals change together in one conditional update
+        order = await push_item(db, order, embedded_item(
+            item.service_id, item.package_id, name, item.quantity, unit_price
+        ))
+        return (await build_order_responses(db, [order], current_user_map(current_user)))[0]
+    
     # Create item
     item_doc = {
         "order_id": order_id,
@@ -146,6 +232,29 @@ async def add_order_item(order_id: str, item: OrderItemCreate, current_user: dic
     
     return await get_order_with_items(db, order_id)
 
+@router.post("/{order_id}/items/batch", response_model=OrderResponse)
+async def batch_order_items(order_id: str, batch: OrderItemBatch, current_user: dict = Depends(get_current_user)):
+    """Apply several add / remove / set_quantity operations in order, as one write"""
+    db = get_db()
+    
+    order, (services_map, packages_map) = await asyncio.gather(
+        load_editable_order(db, order_id, current_user),
+        price_lookup(batch.operations)
+    )
+    
+    if is_embedded(order):
+        order = await edit_items(
+            db, order, lambda items: apply_operations(items, batch.operations, services_map, packages_map)
+        )
+        return (await build_order_responses(db, [order], current_user_map(current_user)))[0]
+    
+    rows = await db.order_items.find({"order_id": order_id}).to_list(None)
+    items = apply_operations(rows, batch.operations, services_map, packages_map)
+    await write_legacy_items(db, order_id, rows, items)
+    await calculate_order_totals(db, order_id)
+    
+    return await get_order_with_items(db, order_id)
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
     db = get_db()
@@ -154,7 +263,10 @@ async def get_order(order_id: str, current_user: dict = Depends(get_current_user
 
 @router.get("", response_model=List[OrderResponse])
 async def get_orders(
+    response: Response,
     status: Optional[OrderStatus] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
@@ -166,14 +278,9 @@ async def get_orders(
     if status:
         query["status"] = status
     
-    orders = await db.orders.find(query).sort("created_at", -1).to_list(100)
+    orders = await paginate(db.orders, query, "created_at", -1, limit, cursor, response)
     
-    result = []
-    for order in orders:
-        order_response = await get_order_with_items(db, str(order["_id"]))
-        result.append(order_response)
-    
-    return result
+    return await build_order_responses(db, orders)
 
 @router.patch("/{order_id}", response_model=OrderResponse)
 async def update_order(order_id: str, update: OrderUpdate, current_user: dict = Depends(get_current_user)):
@@ -226,52 +333,27 @@ async def apply_coupon(order_id: str, coupon: ApplyCouponRequest, current_user:
     if str(order["user_id"]) != current_user["id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Find coupon
-    coupon_doc = await db.coupons.find_one({
-        "code": coupon.code.upper(),
-        "active": True
-    })
+    order = await embed_if_enabled(db, order)
+    coupon_doc = await find_coupon(coupon.code)
     
-    if not coupon_doc:
-        raise HTTPException(status_code=400, detail="Invalid or expired coupon")
-    
-    # Check expiration
-    if coupon_doc.get("expires_at") and coupon_doc["expires_at"] < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Coupon has expired")
-    
-    # Apply discount
-    subtotal = order["subtotal"]
-    if coupon_doc["type"] == "percent":
-        discount = subtotal * (coupon_doc["value"] / 100)
+    # Discount and total are recomputed on every later item change too
+    if is_embedded(order):
+        order = await edit_items(db, order, lambda items: items, coupon_doc["code"], statuses=None)
+        totals = order
     else:
-        discount = min(coupon_doc["value"], subtotal)
-    
-    new_total = subtotal - discount + order.get("tax", 0)
-    
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {"$set": {
-            "coupon_code": coupon.code.upper(),
-            "discount": discount,
-            "total": new_total
-        }}
-    )
+        totals = await calculate_order_totals(db, order_id, coupon_doc["code"])
     
-    return {"message": "Coupon applied", "discount": discount, "new_total": new_total}
+    return {"message": "Coupon applied", "discount": totals["discount"], "new_total": totals["total"]}
 
 @router.delete("/{order_id}/items/{item_id}")
 async def remove_order_item(order_id: str, item_id: str, current_user: dict = Depends(get_current_user)):
     db = get_db()
     
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if str(order["user_id"]) != current_user["id"] and current_user["role"] != "admin":
-        raise HTTPException(status_code=403, detail="Access denied")
+    order = await load_editable_order(db, order_id, current_user)
     
-    if order["status"] not in [OrderStatus.DRAFT, OrderStatus.PENDING]:
-        raise HTTPException(status_code=400, detail="Cannot modify this order")
+    if is_embedded(order):
+        await pull_item(db, order, item_id)
+        return {"message": "Item removed"}
     
     result = await db.order_items.delete_one({"_id": ObjectId(item_id), "order_id": order_id})
     if result.deleted_count == 0:
@@ -1,26 +1,75 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response
+from typing import Optional
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+import hashlib
+import json
 import os
+import time
 from config.database import get_db
 from config.settings import settings
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.payment import (
     CreateCheckoutRequest, CheckoutResponse, PaymentStatus,
-    PaymentTransactionResponse
+    PaymentTransactionResponse, ProviderCheckoutRequest
 )
 from models.order import OrderStatus
 from services.email_service import email_service
-from emergentintegrations.payments.stripe.checkout import (
-    StripeCheckout, CheckoutSessionRequest, CheckoutSessionResponse, CheckoutStatusResponse
-)
+from services.payment_provider import payment_provider, ProviderError, SessionNotFound
+from services.webhook_inbox import webhook_inbox
+from services.checkout_status import checkout_status_cache
+from services.order_items import is_embedded
+from services.payment_sweeper import OPEN_STATUSES
 
 ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@crowncollective.com")
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
 
+# Transactions in these states are never reopened by status polls or webhooks
+FINAL_STATUSES = [PaymentStatus.PAID, PaymentStatus.REFUNDED]
+# Orders past these states are never moved back to paid
+SETTLED_ORDER_STATUSES = [OrderStatus.PAID, OrderStatus.IN_PROGRESS, OrderStatus.COMPLETED, OrderStatus.REFUNDED]
+# Long-polls re-read the transaction this often to see other workers' finalizations
+WAIT_RECHECK_SECONDS = 2
+# How long a finalization may stay unfulfilled before a webhook retry redoes it
+FULFILLMENT_GRACE = timedelta(minutes=2)
+
+def stripe_webhook_url() -> str:
+    # From settings, not the request: the Host header is client-controlled
+    return f"{settings.PUBLIC_API_URL.rstrip('/')}/api/webhook/stripe"
+
+async def checkout_fingerprint(db, order: dict, host_url: str) -> str:
+    """Hash of everything a checkout session is built from: items, totals, coupon and return URLs"""
+    if is_embedded(order):
+        items = order["items"]
+    else:
+        items = await db.order_items.find({"order_id": str(order["_id"])}).to_list(None)
+    contents = {
+        "items": sorted(
+            [str(i.get("service_id")), str(i.get("package_id")), i["quantity"], i["line_total"]] for i in items
+        ),
+        "total": order["total"],
+        "currency": order.get("currency", "usd"),
+        "coupon_code": order.get("coupon_code"),
+        "host_url": host_url
+    }
+    return hashlib.sha256(json.dumps(contents, sort_keys=True).encode()).hexdigest()
+
+async def reusable_checkout(db, order: dict, fingerprint: str) -> Optional[dict]:
+    """The order's last checkout session, if the order is unchanged and the session still open"""
+    checkout = order.get("checkout")
+    if not checkout or checkout["fingerprint"] != fingerprint or checkout["expires_at"] <= datetime.utcnow():
+        return None
+    # Paid, expired or reconciled away since: start over
+    transaction = await db.payment_transactions.find_one(
+        {"session_id": checkout["session_id"], "status": {"$in": OPEN_STATUSES}}, {"_id": 1}
+    )
+    return checkout if transaction else None
+
 @router.post("/create-checkout-session", response_model=CheckoutResponse)
-async def create_checkout_session(request: CreateCheckoutRequest, http_request: Request, current_user: dict = Depends(get_current_user)):
+async def create_checkout_session(request: CreateCheckoutRequest, current_user: dict = Depends(get_current_user)):
     db = get_db()
     
     # Get order
@@ -37,17 +86,20 @@ async def create_checkout_session(request: CreateCheckoutRequest, http_request:
     if order["total"] <= 0:
         raise HTTPException(status_code=400, detail="Order total must be greater than 0")
     
-    # Initialize Stripe
     host_url = request.origin_url.rstrip('/')
-    webhook_url = f"{str(http_request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=settings.STRIPE_API_KEY, webhook_url=webhook_url)
+    
+    # Another click on "pay" for the same order reuses the session it already has
+    fingerprint = await checkout_fingerprint(db, order, host_url)
+    checkout = await reusable_checkout(db, order, fingerprint)
+    if checkout:
+        return CheckoutResponse(url=checkout["url"], session_id=checkout["session_id"])
     
     # Build URLs
     success_url = f"{host_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{host_url}/payment/cancel"
     
     # Create checkout session
-    checkout_request = CheckoutSessionRequest(
+    checkout_request = ProviderCheckoutRequest(
         amount=float(order["total"]),
         currency=order.get("currency", "usd"),
         success_url=success_url,
@@ -59,7 +111,10 @@ async def create_checkout_session(request: CreateCheckoutRequest, http_request:
         }
     )
     
-    session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
+    try:
+        session = await payment_provider.create_checkout_session(stripe_webhook_url(), checkout_request)
+    except ProviderError as e:
+        raise HTTPException(status_code=502, detail=f"Payment provider error: {e}")
     
     # Create payment transaction record
     await db.payment_transactions.insert_one({
@@ -68,47 +123,50 @@ async def create_checkout_session(request: CreateCheckoutRequest, http_request:
         "amount": float(order["total"]),
         "currency": order.get("currency", "usd"),
         "session_id": session.session_id,
-        "provider": "stripe",
+        "provider": payment_provider.name,
         "status": PaymentStatus.INITIATED,
         "payment_status": "initiated",
         "metadata": checkout_request.metadata,
         "created_at": datetime.utcnow()
     })
     
-    # Update order status to pending
+    # Update order status to pending and remember the session for reuse
     await db.orders.update_one(
         {"_id": ObjectId(request.order_id)},
-        {"$set": {"status": OrderStatus.PENDING}}
+        {"$set": {
+            "status": OrderStatus.PENDING,
+            "checkout": {
+                "session_id": session.session_id,
+                "url": session.url,
+                "fingerprint": fingerprint,
+                "expires_at": datetime.utcnow() + timedelta(seconds=settings.CHECKOUT_SESSION_REUSE_SECONDS)
+            }
+        }}
     )
     
     return CheckoutResponse(url=session.url, session_id=session.session_id)
 
-@router.get("/checkout-status/{session_id}")
-async def get_checkout_status(session_id: str, http_request: Request, current_user: dict = Depends(get_current_user)):
-    db = get_db()
-    
-    # Get transaction
+def paid_status(transaction: dict) -> dict:
+    return {
+        "status": "complete",
+        "payment_status": "paid",
+        "amount_total": transaction["amount"],
+        "currency": transaction["currency"]
+    }
+
+async def load_transaction(db, session_id: str, current_user: dict) -> dict:
     transaction = await db.payment_transactions.find_one({"session_id": session_id})
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     if transaction["user_id"] != current_user["id"] and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Check if already processed
-    if transaction["status"] == PaymentStatus.PAID:
-        return {
-            "status": "complete",
-            "payment_status": "paid",
-            "amount_total": transaction["amount"],
-            "currency": transaction["currency"]
-        }
-    
-    # Check with Stripe
-    webhook_url = f"{str(http_request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=settings.STRIPE_API_KEY, webhook_url=webhook_url)
-    
-    status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
+    return transaction
+
+async def refresh_checkout_status(db, transaction: dict, webhook_url: str) -> dict:
+    """Ask the provider for a session's status and record it if it changed"""
+    session_id = transaction["session_id"]
+    status = await payment_provider.get_checkout_status(webhook_url, session_id)
     
     # Update transaction based on status
     new_status = PaymentStatus.PENDING
@@ -117,18 +175,18 @@ async def get_checkout_status(session_id: str, http_request: Request, current_us
     elif status.status == "expired":
         new_status = PaymentStatus.EXPIRED
     
-    # Only process paid status once
-    if new_status == PaymentStatus.PAID and transaction["status"] != PaymentStatus.PAID:
-        await process_successful_payment(db, transaction["order_id"], session_id)
-    
-    # Update transaction
-    await db.payment_transactions.update_one(
-        {"session_id": session_id},
-        {"$set": {
-            "status": new_status,
-            "payment_status": status.payment_status
-        }}
-    )
+    if new_status == PaymentStatus.PAID:
+        # Exactly one of the pollers and webhooks gets to finalize
+        await finalize_payment(db, session_id)
+    elif new_status != transaction["status"] or status.payment_status != transaction.get("payment_status"):
+        # Never move a finalized transaction back
+        await db.payment_transactions.update_one(
+            {"session_id": session_id, "status": {"$nin": FINAL_STATUSES}},
+            {"$set": {
+                "status": new_status,
+                "payment_status": status.payment_status
+            }}
+        )
     
     return {
         "status": status.status,
@@ -137,31 +195,146 @@ async def get_checkout_status(session_id: str, http_request: Request, current_us
         "currency": status.currency
     }
 
+async def checkout_status(db, transaction: dict) -> dict:
+    # Check if already processed
+    if transaction["status"] == PaymentStatus.PAID:
+        return paid_status(transaction)
+    
+    # Check with the provider, at most once per session per cache TTL however many pollers
+    webhook_url = stripe_webhook_url()
+    try:
+        return await checkout_status_cache.get(
+            transaction["session_id"],
+            lambda: refresh_checkout_status(db, transaction, webhook_url)
+        )
+    except ProviderError as e:
+        raise HTTPException(status_code=502, detail=f"Payment provider error: {e}")
+
+async def reconcile_transaction(transaction: dict) -> dict:
+    """payment_sweeper handler: check an open transaction with the provider.
+
+    A session the provider does not know (keys or mode switched, fake
+    provider restarted) can never be paid, so it is expired.
+    """
+    db = get_db()
+    webhook_url = stripe_webhook_url()
+    try:
+        return await checkout_status_cache.get(
+            transaction["session_id"],
+            lambda: refresh_checkout_status(db, transaction, webhook_url)
+        )
+    except SessionNotFound:
+        await db.payment_transactions.update_one(
+            {"session_id": transaction["session_id"], "status": {"$nin": FINAL_STATUSES}},
+            {"$set": {"status": PaymentStatus.EXPIRED, "payment_status": "unknown_session"}}
+        )
+        return {
+            "status": "expired",
+            "payment_status": "unknown_session",
+            "amount_total": transaction["amount"],
+            "currency": transaction["currency"]
+        }
+
+@router.get("/checkout-status/{session_id}")
+async def get_checkout_status(session_id: str, current_user: dict = Depends(get_current_user)):
+    db = get_db()
+    transaction = await load_transaction(db, session_id, current_user)
+    return await checkout_status(db, transaction)
+
+@router.get("/checkout-status/{session_id}/wait")
+async def wait_for_checkout_status(
+    session_id: str,
+    timeout: float = Query(25, ge=1, le=55),
+    current_user: dict = Depends(get_current_user)
+):
+    """Long-poll: return as soon as the session is paid or expired, or after `timeout` seconds"""
+    db = get_db()
+    transaction = await load_transaction(db, session_id, current_user)
+    result = await checkout_status(db, transaction)
+    if result["payment_status"] == "paid" or result["status"] == "expired":
+        return result
+    
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Finalization in this process wakes us directly...
+        notified = await checkout_status_cache.wait(session_id, min(remaining, WAIT_RECHECK_SECONDS))
+        if notified is not None:
+            return notified
+        # ...finalization in another worker shows up on the transaction
+        transaction = await db.payment_transactions.find_one({"session_id": session_id})
+        if transaction["status"] == PaymentStatus.PAID:
+            return paid_status(transaction)
+    
+    return await checkout_status(db, transaction)
+
+async def finalize_payment(db, session_id: str) -> bool:
+    """Mark a checkout session paid and run its side effects, exactly once.
+
+    The conditional update on the transaction is the claim: whichever caller
+    (status poll or webhook) flips it to paid runs process_successful_payment,
+    everyone else gets False and does nothing else.
+    """
+    transaction = await db.payment_transactions.find_one_and_update(
+        {"session_id": session_id, "status": {"$nin": FINAL_STATUSES}},
+        {"$set": {
+            "status": PaymentStatus.PAID,
+            "payment_status": "paid",
+            "paid_at": datetime.utcnow()
+        }},
+        projection={"order_id": 1, "amount": 1, "currency": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if transaction is None:
+        return False
+    checkout_status_cache.notify(session_id, paid_status(transaction))
+    await process_successful_payment(db, transaction["order_id"], session_id)
+    return True
+
+async def fulfill_order(db, order_id: str):
+    """Idempotent part of finalization: order to paid, project upserted by order_id"""
+    order = await db.orders.find_one_and_update(
+        {"_id": ObjectId(order_id), "status": {"$nin": SETTLED_ORDER_STATUSES}},
+        {"$set": {"status": OrderStatus.PAID}},
+        projection={"user_id": 1, "total": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not order:
+        order = await db.orders.find_one({"_id": ObjectId(order_id)}, {"user_id": 1, "total": 1})
+        if not order:
+            return None
+    
+    await db.projects.update_one(
+        {"order_id": order_id},
+        {"$setOnInsert": {
+            "order_id": order_id,
+            "user_id": order["user_id"],
+            "title": f"Project for Order #{order_id[-6:]}",
+            "status": "not_started",
+            "timeline": [],
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    return order
+
 async def process_successful_payment(db, order_id: str, session_id: str):
-    """Process a successful payment - update order and create project"""
-    # Get order
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
+    """Process a successful payment - update order and create project.
+
+    Only called by the winner of finalize_payment, so emails go out once.
+    """
+    order = await fulfill_order(db, order_id)
     if not order:
         return
-    
-    # Update order status
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {"$set": {"status": OrderStatus.PAID}}
+    await db.payment_transactions.update_one(
+        {"session_id": session_id},
+        {"$set": {"fulfilled_at": datetime.utcnow()}}
     )
     
-    # Create project
-    await db.projects.insert_one({
-        "order_id": order_id,
-        "user_id": order["user_id"],
-        "title": f"Project for Order #{order_id[-6:]}",
-        "status": "not_started",
-        "timeline": [],
-        "created_at": datetime.utcnow()
-    })
-    
     # Get user for email
-    user = await db.users.find_one({"_id": order["user_id"]})
+    user = await db.users.find_one({"_id": order["user_id"]}, {"email": 1, "name": 1})
     if user:
         await email_service.send_payment_confirmation(
             user["email"],
@@ -175,38 +348,57 @@ async def process_successful_payment(db, order_id: str, session_id: str):
             user["name"]
         )
 
+async def process_webhook_event(event: dict):
+    """webhook_inbox handler; raising makes the inbox retry the event later"""
+    data = event["data"]
+    if data.get("payment_status") != "paid" or not data.get("session_id"):
+        return
+    
+    db = get_db()
+    if await finalize_payment(db, data["session_id"]):
+        return
+    
+    # Already finalized by someone else: make sure they got as far as fulfilling it
+    transaction = await db.payment_transactions.find_one(
+        {"session_id": data["session_id"], "status": PaymentStatus.PAID, "fulfilled_at": {"$exists": False}},
+        {"order_id": 1, "paid_at": 1}
+    )
+    if transaction is None:
+        return
+    if transaction.get("paid_at") and transaction["paid_at"] > datetime.utcnow() - FULFILLMENT_GRACE:
+        raise RuntimeError("Payment finalization still in progress")
+    await fulfill_order(db, transaction["order_id"])
+    await db.payment_transactions.update_one(
+        {"_id": transaction["_id"]},
+        {"$set": {"fulfilled_at": datetime.utcnow()}}
+    )
+
 @router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
-    """Handle Stripe webhooks"""
-    db = get_db()
+    """Verify a Stripe webhook, queue it in the inbox and acknowledge.
+
+    Processing happens in webhook_inbox workers (process_webhook_event). A
+    failure to store the event is a 500, so Stripe redelivers it.
+    """
     body = await request.body()
     sig = request.headers.get("Stripe-Signature")
     
     try:
-        webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
-        stripe_checkout = StripeCheckout(api_key=settings.STRIPE_API_KEY, webhook_url=webhook_url)
-        webhook_response = await stripe_checkout.handle_webhook(body, sig)
-        
-        if webhook_response.payment_status == "paid":
-            # Get order_id from metadata
-            order_id = webhook_response.metadata.get("order_id")
-            if order_id:
-                # Check if already processed
-                transaction = await db.payment_transactions.find_one({"session_id": webhook_response.session_id})
-                if transaction and transaction["status"] != PaymentStatus.PAID:
-                    await process_successful_payment(db, order_id, webhook_response.session_id)
-                    await db.payment_transactions.update_one(
-                        {"session_id": webhook_response.session_id},
-                        {"$set": {
-                            "status": PaymentStatus.PAID,
-                            "payment_status": "paid"
-                        }}
-                    )
-        
-        return {"status": "success"}
+        webhook_response = await payment_provider.handle_webhook(stripe_webhook_url(), body, sig)
     except Exception as e:
-        print(f"Webhook error: {e}")
-        return {"status": "error", "message": str(e)}
+        raise HTTPException(status_code=400, detail=f"Invalid webhook: {e}")
+    
+    await webhook_inbox.record(
+        webhook_response.event_id,
+        webhook_response.event_type,
+        {
+            "session_id": webhook_response.session_id,
+            "payment_status": webhook_response.payment_status,
+            "metadata": webhook_response.metadata
+        },
+        body.decode("utf-8", errors="replace")
+    )
+    return {"status": "success"}
 
 @router.post("/{payment_id}/refund")
 async def refund_payment(payment_id: str, admin: dict = Depends(require_admin)):
@@ -240,7 +432,12 @@ async def refund_payment(payment_id: str, admin: dict = Depends(require_admin)):
     return {"message": "Payment refunded successfully"}
 
 @router.get("", response_model=list)
-async def get_payments(current_user: dict = Depends(get_current_user)):
+async def get_payments(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """Get payments - admin gets all, client gets own"""
     db = get_db()
     
@@ -248,7 +445,7 @@ async def get_payments(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         query["user_id"] = current_user["id"]
     
-    transactions = await db.payment_transactions.find(query).sort("created_at", -1).to_list(100)
+    transactions = await paginate(db.payment_transactions, query, "created_at", -1, limit, cursor, response)
     
     return [
         PaymentTransactionResponse(
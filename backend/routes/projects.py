@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
 from config.database import get_db
 from middleware.auth import get_current_user, require_admin
+from services.pagination import paginate
 from models.project import (
     ProjectResponse, ProjectUpdate, ProjectStatus,
     TimelineUpdate, TimelineItem
@@ -28,7 +29,10 @@ async def get_project_response(db, project: dict) -> ProjectResponse:
 
 @router.get("", response_model=List[ProjectResponse])
 async def get_projects(
+    response: Response,
     status: Optional[ProjectStatus] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
@@ -39,7 +43,7 @@ async def get_projects(
     if status:
         query["status"] = status
     
-    projects = await db.projects.find(query).sort("created_at", -1).to_list(100)
+    projects = await paginate(db.projects, query, "created_at", -1, limit, cursor, response)
     
     result = []
     for project in projects:
@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Optional, List
 from config.database import get_db
 from middleware.auth import get_current_user, require_admin
+from services.catalog import catalog
 from models.service import (
     ServiceCreate, ServiceUpdate, ServiceResponse,
     PackageCreate, PackageUpdate, PackageResponse
@@ -15,9 +16,7 @@ router = APIRouter(prefix="/api", tags=["Services"])
 
 @router.get("/services", response_model=List[ServiceResponse])
 async def get_services(active_only: bool = True):
-    db = get_db()
-    query = {"active": True} if active_only else {}
-    services = await db.services.find(query).to_list(100)
+    services = await catalog.services(active_only)
     return [
         ServiceResponse(
             id=str(s["_id"]),
@@ -33,8 +32,7 @@ async def get_services(active_only: bool = True):
 
 @router.get("/services/{service_id}", response_model=ServiceResponse)
 async def get_service(service_id: str):
-    db = get_db()
-    service = await db.services.find_one({"_id": ObjectId(service_id)})
+    service = await catalog.service(service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     return ServiceResponse(
@@ -57,6 +55,7 @@ async def create_service(service: ServiceCreate, admin: dict = Depends(require_a
     }
     result = await db.services.insert_one(service_doc)
     service_doc["_id"] = result.inserted_id
+    await catalog.bump()
     return ServiceResponse(
         id=str(result.inserted_id),
         **service.model_dump(),
@@ -77,6 +76,7 @@ async def update_service(service_id: str, update: ServiceUpdate, admin: dict = D
     )
     if not result:
         raise HTTPException(status_code=404, detail="Service not found")
+    await catalog.bump()
     
     return ServiceResponse(
         id=str(result["_id"]),
@@ -95,15 +95,14 @@ async def delete_service(service_id: str, admin: dict = Depends(require_admin)):
     result = await db.services.delete_one({"_id": ObjectId(service_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Service not found")
+    await catalog.bump()
     return {"message": "Service deleted successfully"}
 
 # ============ PACKAGES ============
 
 @router.get("/packages", response_model=List[PackageResponse])
 async def get_packages(active_only: bool = True):
-    db = get_db()
-    query = {"active": True} if active_only else {}
-    packages = await db.packages.find(query).to_list(100)
+    packages = await catalog.packages(active_only)
     return [
         PackageResponse(
             id=str(p["_id"]),
@@ -124,6 +123,7 @@ async def create_package(package: PackageCreate, admin: dict = Depends(require_a
         "created_at": datetime.utcnow()
     }
     result = await db.packages.insert_one(package_doc)
+    await catalog.bump()
     return PackageResponse(
         id=str(result.inserted_id),
         **package.model_dump(),
@@ -144,6 +144,7 @@ async def update_package(package_id: str, update: PackageUpdate, admin: dict = D
     )
     if not result:
         raise HTTPException(status_code=404, detail="Package not found")
+    await catalog.bump()
     
     return PackageResponse(
         id=str(result["_id"]),
@@ -161,4 +162,5 @@ async def delete_package(package_id: str, admin: dict = Depends(require_admin)):
     result = await db.packages.delete_one({"_id": ObjectId(package_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Package not found")
+    await catalog.bump()
     return {"message": "Package deleted successfully"}
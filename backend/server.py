@@ -1,26 +1,74 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import datetime
+from pymongo import UpdateOne
+import asyncio
 import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from config.database import connect_db, close_db
+from config.database import connect_db, close_db, ensure_indexes
+from config.bootstrap import run_startup, StartupFailed
+from config.indexes import registry_fingerprint
+from config.settings import settings
+from middleware.profiling import DbProfilingMiddleware
+from middleware.idempotency import IdempotencyMiddleware, REPLAYED_HEADER
+from services.db_profiler import db_profiler
+from services.password_hasher import password_hasher
+from services.pagination import NEXT_CURSOR_HEADER
+from services.catalog import catalog
+from services.webhook_inbox import webhook_inbox
+from services.payment_sweeper import payment_sweeper
+from middleware.auth import hash_password
 from routes import auth, services, orders, payments, intake, projects, messages, files, admin, client_projects
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump when seed_* below change so the next boot re-runs them
+SEED_VERSION = 1
+
+async def startup(db):
+    """Run (or wait for another worker to run) index sync and seeding"""
+    try:
+        result = await run_startup(
+            db,
+            version=f"{registry_fingerprint()}:{SEED_VERSION}",
+            tasks=[ensure_indexes, seed_admin, seed_services, seed_packages],
+            lock_ttl_seconds=settings.STARTUP_LOCK_TTL_SECONDS
+        )
+    except StartupFailed as e:
+        logger.error(f"Startup failed, staying unready: {e}")
+        app.state.startup_error = str(e)
+        return
+    logger.info(f"Startup tasks: {result}")
+    app.state.ready = True
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await connect_db()
-    await seed_data()
+    app.state.ready = False
+    db = await connect_db()
+    db_profiler.attach(asyncio.get_running_loop(), db)
+    startup_task = asyncio.create_task(startup(db))
+    try:
+        # Serve only once startup is done, unless it outlasts the wait timeout
+        await asyncio.wait_for(asyncio.shield(startup_task), settings.STARTUP_WAIT_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Startup tasks still running; /api/health/ready reports 503 until they finish")
+    webhook_inbox.start(payments.process_webhook_event)
+    payment_sweeper.start(payments.reconcile_transaction)
     yield
     # Shutdown
+    await payment_sweeper.stop()
+    await webhook_inbox.stop()
+    startup_task.cancel()
     await close_db()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Crown Collective Creative API",
@@ -29,6 +77,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Replays Idempotency-Key retries; inside CORS so replayed responses get CORS headers too
+app.add_middleware(IdempotencyMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,8 +87,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER],
 )
 
+# Attribute Mongo commands to routes for /api/admin/metrics
+app.add_middleware(DbProfilingMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(services.router)
@@ -50,6 +105,10 @@ app.include_router(files.router)
 app.include_router(admin.router)
 app.include_router(client_projects.router)
 
+if settings.PAYMENT_PROVIDER == "fake":
+    from routes import fake_payments
+    app.include_router(fake_payments.router)
+
 # Stripe webhook needs to be at root level
 from routes.payments import stripe_webhook
 app.post("/api/webhook/stripe")(stripe_webhook)
@@ -58,111 +117,121 @@ app.post("/api/webhook/stripe")(stripe_webhook)
 async def health_check():
     return {"status": "healthy", "service": "Crown Collective Creative API"}
 
-async def seed_data():
-    """Seed initial data"""
-    from config.database import get_db
-    from middleware.auth import hash_password
-    from datetime import datetime
-    
-    db = get_db()
-    
-    # Create admin user if not exists
-    admin_exists = await db.users.find_one({"email": "admin@crowncollective.com"})
-    if not admin_exists:
-        await db.users.insert_one({
+@app.get("/api/health/ready")
+async def readiness_check():
+    """503 until indexes and seed data are in place"""
+    error = getattr(app.state, "startup_error", None)
+    if error:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": error})
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+SEED_SERVICES = [
+    {
+        "name": "Auto-Pilot Automation",
+        "description": "Connect your favorite apps so they talk to each other automatically. Your business runs itself so you can focus on the big picture.",
+        "base_price": 1500.00,
+        "category": "automation",
+        "deliverables_text": "Custom automation workflows, app integrations, documentation",
+        "active": True
+    },
+    {
+        "name": "Pro Landing Page",
+        "description": "Clean, fast websites that make people trust you. We build pages that turn visitors into fans.",
+        "base_price": 2500.00,
+        "category": "web_design",
+        "deliverables_text": "Custom landing page, mobile responsive, SEO optimized",
+        "active": True
+    },
+    {
+        "name": "SEO & Visibility Boost",
+        "description": "We put you at the top of Google and Yelp. When people search for help, they find you before anyone else.",
+        "base_price": 1000.00,
+        "category": "marketing",
+        "deliverables_text": "SEO audit, keyword optimization, local listings setup",
+        "active": True
+    },
+    {
+        "name": "AI Integration Suite",
+        "description": "Get your own AI-powered team that works for you every hour of every day.",
+        "base_price": 3500.00,
+        "category": "ai",
+        "deliverables_text": "Custom AI chatbot, automation setup, training & support",
+        "active": True
+    },
+    {
+        "name": "Brand Identity Package",
+        "description": "Complete brand identity including logo, color palette, typography, and brand guidelines.",
+        "base_price": 2000.00,
+        "category": "branding",
+        "deliverables_text": "Logo design, brand guidelines, social media kit",
+        "active": True
+    }
+]
+
+SEED_PACKAGES = [
+    {
+        "name": "The Opening",
+        "tier": "foundation",
+        "price": 1500.00,
+        "included_services": ["Web Audit", "Social Setup", "Simple Tracking"],
+        "active": True
+    },
+    {
+        "name": "The Mid-Game",
+        "tier": "solution",
+        "price": 4500.00,
+        "included_services": ["Smart Landing Page", "Google & Yelp Boost", "24/7 Support Staff"],
+        "active": True
+    },
+    {
+        "name": "The End-Game",
+        "tier": "digit-all",
+        "price": 9500.00,
+        "included_services": ["Full AI Systems", "Private 24/7 Team", "Infinite Support"],
+        "active": True
+    }
+]
+
+async def seed_admin(db):
+    """Create the admin user if missing"""
+    if await db.users.find_one({"email": "admin@crowncollective.com"}, {"_id": 1}):
+        return
+    now = datetime.utcnow()
+    result = await db.users.update_one(
+        {"email": "admin@crowncollective.com"},
+        {"$setOnInsert": {
             "name": "Admin",
             "email": "admin@crowncollective.com",
-            "password_hash": hash_password("admin123"),
+            "password_hash": await hash_password("admin123"),
             "role": "admin",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
+            "created_at": now,
+            "updated_at": now
+        }},
+        upsert=True
+    )
+    if result.upserted_id:
         logger.info("Admin user created")
-    
-    # Seed services if empty
-    services_count = await db.services.count_documents({})
-    if services_count == 0:
-        services = [
-            {
-                "name": "Auto-Pilot Automation",
-                "description": "Connect your favorite apps so they talk to each other automatically. Your business runs itself so you can focus on the big picture.",
-                "base_price": 1500.00,
-                "category": "automation",
-                "deliverables_text": "Custom automation workflows, app integrations, documentation",
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "Pro Landing Page",
-                "description": "Clean, fast websites that make people trust you. We build pages that turn visitors into fans.",
-                "base_price": 2500.00,
-                "category": "web_design",
-                "deliverables_text": "Custom landing page, mobile responsive, SEO optimized",
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "SEO & Visibility Boost",
-                "description": "We put you at the top of Google and Yelp. When people search for help, they find you before anyone else.",
-                "base_price": 1000.00,
-                "category": "marketing",
-                "deliverables_text": "SEO audit, keyword optimization, local listings setup",
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "AI Integration Suite",
-                "description": "Get your own AI-powered team that works for you every hour of every day.",
-                "base_price": 3500.00,
-                "category": "ai",
-                "deliverables_text": "Custom AI chatbot, automation setup, training & support",
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "Brand Identity Package",
-                "description": "Complete brand identity including logo, color palette, typography, and brand guidelines.",
-                "base_price": 2000.00,
-                "category": "branding",
-                "deliverables_text": "Logo design, brand guidelines, social media kit",
-                "active": True,
-                "created_at": datetime.utcnow()
-            }
-        ]
-        await db.services.insert_many(services)
-        logger.info("Services seeded")
-    
-    # Seed packages if empty
-    packages_count = await db.packages.count_documents({})
-    if packages_count == 0:
-        packages = [
-            {
-                "name": "The Opening",
-                "tier": "foundation",
-                "price": 1500.00,
-                "included_services": ["Web Audit", "Social Setup", "Simple Tracking"],
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "The Mid-Game",
-                "tier": "solution",
-                "price": 4500.00,
-                "included_services": ["Smart Landing Page", "Google & Yelp Boost", "24/7 Support Staff"],
-                "active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "name": "The End-Game",
-                "tier": "digit-all",
-                "price": 9500.00,
-                "included_services": ["Full AI Systems", "Private 24/7 Team", "Infinite Support"],
-                "active": True,
-                "created_at": datetime.utcnow()
-            }
-        ]
-        await db.packages.insert_many(packages)
-        logger.info("Packages seeded")
+
+async def seed_catalog(collection, documents: list):
+    """Upsert catalog entries by name in one bulk write, only into an empty collection"""
+    if await collection.find_one({}, {"_id": 1}):
+        return
+    now = datetime.utcnow()
+    result = await collection.bulk_write([
+        UpdateOne({"name": doc["name"]}, {"$setOnInsert": {**doc, "created_at": now}}, upsert=True)
+        for doc in documents
+    ], ordered=False)
+    if result.upserted_count:
+        await catalog.bump()
+        logger.info(f"{collection.name.capitalize()} seeded")
+
+async def seed_services(db):
+    await seed_catalog(db.services, SEED_SERVICES)
+
+async def seed_packages(db):
+    await seed_catalog(db.packages, SEED_PACKAGES)
 
 if __name__ == "__main__":
     import uvicorn
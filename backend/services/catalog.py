@@ -0,0 +1,116 @@
+from typing import Optional
+from pymongo import ReturnDocument
+import asyncio
+import logging
+import time
+from config.database import get_db
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """In-process copy of the services and packages collections, keyed by id.
+
+    Every write to either collection bumps a version counter in
+    catalog_meta. Each worker compares its snapshot's version with that
+    counter at most every `check_seconds` (one find_one by _id), in the
+    background, and reloads both collections when it moved. Reads are
+    served from memory; only the very first one waits for the database.
+    """
+
+    def __init__(self, check_seconds: float = 5):
+        self.check_seconds = check_seconds
+        self._services = {}
+        self._packages = {}
+        self._version = None
+        self._checked_at = None
+        self._lock = None
+        self._checking = None
+        self.loads = 0
+        self.checks = 0
+        self.check_failures = 0
+
+    async def _load(self):
+        db = get_db()
+        # Read the version first: a write racing with the load leaves us one
+        # version behind, and the next check reloads
+        meta = await db.catalog_meta.find_one({"_id": "catalog"}, {"version": 1})
+        version = meta["version"] if meta else 0
+        self.checks += 1
+        if version != self._version:
+            services, packages = await asyncio.gather(
+                db.services.find({}).to_list(None),
+                db.packages.find({}).to_list(None)
+            )
+            self._services = {str(s["_id"]): s for s in services}
+            self._packages = {str(p["_id"]): p for p in packages}
+            self._version = version
+            self.loads += 1
+        self._checked_at = time.monotonic()
+
+    async def _load_if(self, predicate):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if predicate():
+                await self._load()
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at > self.check_seconds
+
+    async def _check_in_background(self):
+        try:
+            await self._load_if(self._is_stale)
+        except Exception as e:
+            # Keep serving the current snapshot; the next read retries
+            self.check_failures += 1
+            logger.warning(f"Catalog version check failed: {e}")
+
+    async def _ready(self):
+        if self._version is None:
+            await self._load_if(lambda: self._version is None)
+        elif self._is_stale() and (self._checking is None or self._checking.done()):
+            self._checking = asyncio.create_task(self._check_in_background())
+
+    async def services(self, active_only: bool = False) -> list:
+        await self._ready()
+        return [s for s in self._services.values() if s.get("active") or not active_only]
+
+    async def packages(self, active_only: bool = False) -> list:
+        await self._ready()
+        return [p for p in self._packages.values() if p.get("active") or not active_only]
+
+    async def service(self, service_id: str) -> Optional[dict]:
+        await self._ready()
+        return self._services.get(service_id)
+
+    async def package(self, package_id: str) -> Optional[dict]:
+        await self._ready()
+        return self._packages.get(package_id)
+
+    async def bump(self) -> int:
+        """Record a catalog write so every worker reloads; reloads this one right away"""
+        db = get_db()
+        doc = await db.catalog_meta.find_one_and_update(
+            {"_id": "catalog"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self._load_if(lambda: self._version != doc["version"])
+        return doc["version"]
+
+    def stats(self) -> dict:
+        return {
+            "version": self._version,
+            "services": len(self._services),
+            "packages": len(self._packages),
+            "check_seconds": self.check_seconds,
+            "checks": self.checks,
+            "loads": self.loads,
+            "check_failures": self.check_failures
+        }
+
+
+catalog = CatalogSnapshot(check_seconds=settings.CATALOG_CHECK_SECONDS)
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import time
+from config.settings import settings
+
+
+class CheckoutStatusCache:
+    """Coalesced, short-lived cache of checkout session status, plus waiters.
+
+    Concurrent lookups for one session share a single provider call and its
+    result is reused for `ttl_seconds`. Long-poll requests wait for
+    `notify()`, which payment finalization fires in this process.
+    """
+
+    def __init__(self, ttl_seconds: float = 5, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight = {}
+        self._waiters = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.notifications = 0
+
+    def _store(self, session_id: str, result: dict):
+        self._results[session_id] = (time.monotonic() + self.ttl_seconds, result)
+        self._results.move_to_end(session_id)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def cached(self, session_id: str) -> Optional[dict]:
+        entry = self._results.get(session_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._results[session_id]
+            return None
+        return entry[1]
+
+    async def get(self, session_id: str, fetch) -> dict:
+        """Cached status, or the result of fetch() shared by every concurrent caller"""
+        result = self.cached(session_id)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        task = self._inflight.get(session_id)
+        if task is None:
+            self.fetches += 1
+            # A task of its own, so a caller that disconnects does not cancel it for the others
+            task = self._inflight[session_id] = asyncio.create_task(self._fetch(session_id, fetch))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, session_id: str, fetch) -> dict:
+        try:
+            result = await fetch()
+            self._store(session_id, result)
+            return result
+        finally:
+            del self._inflight[session_id]
+
+    async def wait(self, session_id: str, timeout: float) -> Optional[dict]:
+        """Wait up to `timeout` for notify(session_id); the notified result or None"""
+        waiter = self._waiters.get(session_id)
+        if waiter is None:
+            waiter = self._waiters[session_id] = [asyncio.Event(), 0]
+        waiter[1] += 1
+        try:
+            await asyncio.wait_for(waiter[0].wait(), timeout)
+            return self.cached(session_id)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiter[1] -= 1
+            if waiter[1] == 0 and self._waiters.get(session_id) is waiter:
+                del self._waiters[session_id]
+
+    def notify(self, session_id: str, result: dict):
+        """Record a final status and wake this process's long-polls for the session"""
+        self.notifications += 1
+        self._store(session_id, result)
+        waiter = self._waiters.pop(session_id, None)
+        if waiter is not None:
+            waiter[0].set()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._results),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "notifications": self.notifications,
+            "waiting_sessions": len(self._waiters)
+        }
+
+
+checkout_status_cache = CheckoutStatusCache(ttl_seconds=settings.CHECKOUT_STATUS_CACHE_SECONDS)
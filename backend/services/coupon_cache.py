@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from typing import Optional
+from pymongo import ReturnDocument
+import asyncio
+import logging
+import time
+from config.database import get_db
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CouponCache:
+    """In-process cache of coupon documents by code, including unknown codes.
+
+    Known codes are kept for `ttl_seconds` and unknown ones for the shorter
+    `negative_ttl_seconds`, in separate LRUs so guessing traffic cannot evict
+    real coupons. Active/expiry checks are left to the caller, in memory.
+    Coupon writes bump a version in catalog_meta; every worker checks it in
+    the background at most every `check_seconds` and drops both LRUs when it
+    moved.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 60,
+        negative_ttl_seconds: int = 10,
+        max_entries: int = 10000,
+        check_seconds: float = 5
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.check_seconds = check_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._version = None
+        self._checked_at = None
+        self._checking = None
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _put(entries: OrderedDict, key: str, value, max_entries: int):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def _cached(self, code: str):
+        """(found, doc) from memory; found is False when the database must be asked"""
+        now = time.monotonic()
+        entry = self._entries.get(code)
+        if entry is not None:
+            if entry[0] >= now:
+                self._entries.move_to_end(code)
+                self.hits += 1
+                return True, entry[1]
+            del self._entries[code]
+
+        expires_at = self._negative.get(code)
+        if expires_at is not None:
+            if expires_at >= now:
+                self.negative_hits += 1
+                return True, None
+            del self._negative[code]
+
+        self.misses += 1
+        return False, None
+
+    async def _check_version(self):
+        try:
+            db = get_db()
+            meta = await db.catalog_meta.find_one({"_id": "coupons"}, {"version": 1})
+            version = meta["version"] if meta else 0
+            if self._version is not None and version != self._version:
+                self.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Coupon version check failed: {e}")
+
+    def _schedule_check(self):
+        stale = self._checked_at is None or time.monotonic() - self._checked_at > self.check_seconds
+        if stale and (self._checking is None or self._checking.done()):
+            self._checking = asyncio.create_task(self._check_version())
+
+    async def get(self, code: str) -> Optional[dict]:
+        """The coupon document for a code (any state), or None if no such coupon"""
+        code = code.upper()
+        self._schedule_check()
+        found, doc = self._cached(code)
+        if found:
+            return doc
+
+        db = get_db()
+        generation = self._generation
+        doc = await db.coupons.find_one({"code": code})
+        if generation != self._generation:
+            # Cleared while we were reading; the result may predate the write
+            return doc
+        if doc is None:
+            if self.negative_ttl_seconds > 0:
+                self._put(self._negative, code, time.monotonic() + self.negative_ttl_seconds, self.max_entries)
+        elif self.ttl_seconds > 0:
+            self._put(self._entries, code, (time.monotonic() + self.ttl_seconds, doc), self.max_entries)
+        return doc
+
+    async def bump(self) -> int:
+        """Record a coupon write so every worker drops its cache; clears this one now"""
+        db = get_db()
+        doc = await db.catalog_meta.find_one_and_update(
+            {"_id": "coupons"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.clear()
+        self._version = doc["version"]
+        return doc["version"]
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._negative.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "negative_size": len(self._negative),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "negative_ttl_seconds": self.negative_ttl_seconds,
+            "version": self._version,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+coupon_cache = CouponCache(
+    ttl_seconds=settings.COUPON_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.COUPON_NEGATIVE_TTL_SECONDS,
+    max_entries=settings.COUPON_CACHE_MAX_ENTRIES,
+    check_seconds=settings.CATALOG_CHECK_SECONDS
+)
@@ -0,0 +1,239 @@
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+import asyncio
+import logging
+import threading
+import bson
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Commands whose cost is not attributable to a route query
+IGNORED_COMMANDS = {
+    "explain", "hello", "isMaster", "ismaster", "ping", "saslStart", "saslContinue",
+    "endSessions", "killCursors", "buildInfo", "getLastError"
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Connection/session fields that cannot be sent back inside an explain
+COMMAND_META_FIELDS = {"$db", "lsid", "$clusterTime", "txnNumber", "$readPreference", "autocommit"}
+
+
+class RequestProfile:
+    """Mongo activity of one HTTP request; the ASGI scope resolves the route lazily"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.commands = 0
+        self.db_ms = 0.0
+
+    @property
+    def route(self) -> str:
+        endpoint = self.scope.get("endpoint")
+        if endpoint is None:
+            return "unrouted"
+        return f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+
+
+current_request: ContextVar[Optional[RequestProfile]] = ContextVar("current_request", default=None)
+
+
+def query_shape(value):
+    """Replace literal values with their type names, keeping operators and field names"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return type(value).__name__
+
+
+def command_filter(command_name: str, command: dict):
+    if command_name == "find":
+        return command.get("filter", {}), command.get("sort")
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return pipeline[0].get("$match", {}), None
+    if command_name in ("count", "findAndModify"):
+        return command.get("query", {}), command.get("sort")
+    if command_name == "distinct":
+        return command.get("query", {}), None
+    if command_name == "update":
+        return (command.get("updates") or [{}])[0].get("q", {}), None
+    if command_name == "delete":
+        return (command.get("deletes") or [{}])[0].get("q", {}), None
+    return None, None
+
+
+def reply_doc_count(command_name: str, reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return int(reply.get("n", 0))
+
+
+class DbProfiler(monitoring.CommandListener):
+    """pymongo command listener that attributes every command to the current route.
+
+    Keeps per-route aggregates (requests, commands, time, docs and, with
+    `count_bytes`, reply bytes) and a bounded log of commands slower than
+    `slow_ms`, optionally with the queryPlanner output of an explain() run
+    in the background. Measuring a reply re-encodes it, so per-route byte
+    counts are opt-in; slow queries are always measured.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        slow_ms: float = 100,
+        explain: bool = False,
+        count_bytes: bool = False,
+        slow_log_size: int = 100
+    ):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.count_bytes = count_bytes
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._routes = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._explain_db = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop, db):
+        """Give the profiler the event loop and database used to run explain()"""
+        self._loop = loop
+        self._explain_db = db
+
+    def _route_stats(self, route: str) -> dict:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {
+                "requests": 0, "commands": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "docs": 0, "bytes": 0, "failures": 0, "by_command": {}
+            }
+        return stats
+
+    # ---- request hooks (called from the ASGI middleware) ----
+
+    def request_finished(self, profile: RequestProfile):
+        with self._lock:
+            self._route_stats(profile.route)["requests"] += 1
+
+    # ---- CommandListener ----
+
+    def started(self, event):
+        if not self.enabled or event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        command_copy = None
+        if self.explain and event.command_name in EXPLAINABLE_COMMANDS:
+            command_copy = {k: v for k, v in command.items() if k not in COMMAND_META_FIELDS}
+        self._pending[(event.connection_id, event.request_id)] = (
+            current_request.get(),
+            collection if isinstance(collection, str) else None,
+            command_filter(event.command_name, command),
+            command_copy
+        )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        profile, collection, (query, sort), command_copy = pending
+        elapsed_ms = event.duration_micros / 1000
+        route = profile.route if profile else "background"
+        label = f"{collection}.{event.command_name}" if collection else event.command_name
+
+        slow = elapsed_ms >= self.slow_ms
+        docs = 0
+        size = 0
+        if not failed:
+            docs = reply_doc_count(event.command_name, event.reply)
+            if self.count_bytes or slow:
+                size = len(bson.encode(event.reply))
+
+        if profile:
+            profile.commands += 1
+            profile.db_ms += elapsed_ms
+
+        with self._lock:
+            stats = self._route_stats(route)
+            stats["commands"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["docs"] += docs
+            if self.count_bytes:
+                stats["bytes"] += size
+            stats["failures"] += int(failed)
+            stats["by_command"][label] = stats["by_command"].get(label, 0) + 1
+
+        if slow:
+            entry = {
+                "route": route,
+                "command": label,
+                "duration_ms": round(elapsed_ms, 3),
+                "docs": docs,
+                "bytes": size,
+                "filter": query_shape(query) if query is not None else None,
+                "sort": dict(sort) if sort else None
+            }
+            with self._lock:
+                self.slow_queries.append(entry)
+            logger.warning(
+                f"Slow query {label} on {route}: {entry['duration_ms']} ms, "
+                f"{docs} docs, filter={entry['filter']}, sort={entry['sort']}"
+            )
+            if command_copy is not None and self._loop is not None:
+                asyncio.run_coroutine_threadsafe(self._capture_explain(entry, command_copy), self._loop)
+
+    async def _capture_explain(self, entry: dict, command: dict):
+        try:
+            result = await self._explain_db.command({"explain": command, "verbosity": "queryPlanner"})
+            entry["explain"] = result.get("queryPlanner", {}).get("winningPlan")
+        except Exception as e:
+            entry["explain"] = {"error": str(e)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, s in self._routes.items():
+                requests = s["requests"] or 1
+                routes[route] = {
+                    **s,
+                    "total_ms": round(s["total_ms"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                    "commands_per_request": round(s["commands"] / requests, 2),
+                    "by_command": dict(s["by_command"])
+                }
+            slow_queries = list(self.slow_queries)
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "count_bytes": self.count_bytes,
+            "routes": dict(sorted(routes.items(), key=lambda r: r[1]["total_ms"], reverse=True)),
+            "slow_queries": slow_queries
+        }
+
+
+db_profiler = DbProfiler(
+    enabled=settings.DB_PROFILING_ENABLED,
+    slow_ms=settings.DB_SLOW_QUERY_MS,
+    explain=settings.DB_SLOW_QUERY_EXPLAIN,
+    count_bytes=settings.DB_PROFILE_REPLY_BYTES
+)
@@ -0,0 +1,171 @@
+"""In-process stand-in for Stripe checkout, for offline load and latency tests.
+
+Selected with PAYMENT_PROVIDER=fake. Sessions live in this process's memory,
+so run the API as a single worker. Every call sleeps FAKE_PAYMENT_LATENCY_MS
+(plus up to FAKE_PAYMENT_JITTER_MS) and fails with probability
+FAKE_PAYMENT_FAILURE_RATE. Paying is simulated by complete(), exposed at
+POST /api/fake-payments/sessions/{id}/complete: it marks the session paid
+and delivers a checkout.session.completed webhook signed like Stripe's
+(`Stripe-Signature: t=<ts>,v1=<HMAC-SHA256 of "<ts>.<body>">`).
+"""
+from datetime import datetime
+from typing import Optional
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+import uuid
+import httpx
+from models.payment import (
+    ProviderCheckoutRequest, ProviderCheckoutSession, ProviderCheckoutStatus, ProviderWebhookEvent
+)
+from services.payment_provider import PaymentProvider, ProviderError, SessionNotFound
+
+logger = logging.getLogger(__name__)
+
+# Webhooks signed longer ago than this are rejected, as Stripe's SDK does
+SIGNATURE_TOLERANCE_SECONDS = 300
+
+
+def sign_payload(secret: str, body: bytes, timestamp: Optional[int] = None) -> str:
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+class FakePaymentProvider(PaymentProvider):
+    name = "fake"
+
+    def __init__(self, webhook_secret: str, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0):
+        super().__init__()
+        self.webhook_secret = webhook_secret
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._sessions = {}
+        self._http = None
+        self.webhooks_sent = 0
+        self.webhooks_failed = 0
+
+    async def _simulate(self, operation: str):
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.failure_rate > 0 and random.random() < self.failure_rate:
+            raise ProviderError(f"Injected failure in {operation}")
+
+    def _session(self, session_id: str) -> dict:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(f"No such checkout session: {session_id}")
+        return session
+
+    async def _create_checkout_session(self, webhook_url: str, request: ProviderCheckoutRequest) -> ProviderCheckoutSession:
+        await self._simulate("create_checkout_session")
+        session_id = f"cs_fake_{uuid.uuid4().hex}"
+        self._sessions[session_id] = {
+            "amount_total": int(round(request.amount * 100)),
+            "currency": request.currency,
+            "metadata": dict(request.metadata),
+            "status": "open",
+            "payment_status": "unpaid",
+            "webhook_url": webhook_url,
+            "created_at": datetime.utcnow()
+        }
+        # No hosted page: the "customer" lands straight on the success URL
+        url = request.success_url.replace("{CHECKOUT_SESSION_ID}", session_id)
+        return ProviderCheckoutSession(session_id=session_id, url=url)
+
+    async def _get_checkout_status(self, webhook_url: str, session_id: str) -> ProviderCheckoutStatus:
+        await self._simulate("get_checkout_status")
+        session = self._session(session_id)
+        return ProviderCheckoutStatus(
+            status=session["status"],
+            payment_status=session["payment_status"],
+            amount_total=session["amount_total"],
+            currency=session["currency"],
+            metadata=session["metadata"]
+        )
+
+    async def _handle_webhook(self, webhook_url: str, body: bytes, signature: str) -> ProviderWebhookEvent:
+        await self._simulate("handle_webhook")
+        parts = dict(part.split("=", 1) for part in (signature or "").split(",") if "=" in part)
+        if "t" not in parts or "v1" not in parts:
+            raise ProviderError("Missing webhook signature")
+        expected = sign_payload(self.webhook_secret, body, int(parts["t"])).split("v1=", 1)[1]
+        if not hmac.compare_digest(expected, parts["v1"]):
+            raise ProviderError("Webhook signature mismatch")
+        if abs(time.time() - int(parts["t"])) > SIGNATURE_TOLERANCE_SECONDS:
+            raise ProviderError("Webhook signature expired")
+
+        event = json.loads(body)
+        session = event["data"]["object"]
+        return ProviderWebhookEvent(
+            event_id=event["id"],
+            event_type=event["type"],
+            session_id=session["id"],
+            payment_status=session["payment_status"],
+            metadata=session.get("metadata") or {}
+        )
+
+    async def complete(self, session_id: str, deliver: bool = True) -> dict:
+        """Pay a session and (unless deliver is False) send its signed webhook; returns the event"""
+        session = self._session(session_id)
+        session["status"] = "complete"
+        session["payment_status"] = "paid"
+        return await self._send_event(session_id, session, "checkout.session.completed", deliver)
+
+    async def expire(self, session_id: str, deliver: bool = True) -> dict:
+        session = self._session(session_id)
+        if session["payment_status"] == "paid":
+            raise ProviderError("Session is already paid")
+        session["status"] = "expired"
+        return await self._send_event(session_id, session, "checkout.session.expired", deliver)
+
+    async def _send_event(self, session_id: str, session: dict, event_type: str, deliver: bool) -> dict:
+        event = {
+            "id": f"evt_fake_{uuid.uuid4().hex}",
+            "type": event_type,
+            "created": int(time.time()),
+            "data": {"object": {
+                "id": session_id,
+                "status": session["status"],
+                "payment_status": session["payment_status"],
+                "amount_total": session["amount_total"],
+                "currency": session["currency"],
+                "metadata": session["metadata"]
+            }}
+        }
+        if not deliver:
+            return event
+
+        body = json.dumps(event).encode()
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=10)
+        try:
+            response = await self._http.post(
+                session["webhook_url"],
+                content=body,
+                headers={"Content-Type": "application/json", "Stripe-Signature": sign_payload(self.webhook_secret, body)}
+            )
+            response.raise_for_status()
+            self.webhooks_sent += 1
+        except httpx.HTTPError as e:
+            # Like Stripe, a failed delivery leaves the status poll / sweeper to catch up
+            self.webhooks_failed += 1
+            logger.warning(f"Fake webhook delivery for {session_id} failed: {e}")
+        return event
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "failure_rate": self.failure_rate,
+            "sessions": len(self._sessions),
+            "webhooks_sent": self.webhooks_sent,
+            "webhooks_failed": self.webhooks_failed
+        }
@@ -0,0 +1,213 @@
+"""Stored responses for requests sent with an Idempotency-Key header.
+
+A key is scoped to the authenticated user, the method and the path (see
+middleware/idempotency.py for which requests take part), and remembers a hash of the request body. The first request claims
+the key by inserting an in-progress record into idempotency_keys (TTL
+indexed on expires_at); once it finishes, its response is stored there and
+in a per-worker LRU in front of it. Replays get the stored response.
+Duplicates that arrive while the first is still running wait for it, on
+an in-process event in the same worker or by polling the record from
+another one. A lapsed claim (the worker died) can be taken over.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import hashlib
+import logging
+import time
+from config.database import get_db
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+# How often a duplicate re-reads a claim held by another worker
+POLL_SECONDS = 0.1
+
+
+class IdempotencyConflict(Exception):
+    """The key is taken by a different request, or its first request is still running"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def record_id(user_id: str, method: str, path: str, key: str) -> str:
+    return hashlib.sha256(f"{user_id}\n{method}\n{path}\n{key}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        ttl_seconds: float = 86400,
+        lock_seconds: float = 60,
+        wait_seconds: float = 10,
+        max_entries: int = 10000
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[str, tuple]" = OrderedDict()
+        self._running = {}
+        self.executed = 0
+        self.replayed = 0
+        self.cache_hits = 0
+        self.waited = 0
+        self.conflicts = 0
+        self.released = 0
+
+    def _cache(self, key_id: str, record: dict):
+        self._responses[key_id] = (time.monotonic() + self.ttl_seconds, record)
+        self._responses.move_to_end(key_id)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def _cached(self, key_id: str) -> Optional[dict]:
+        entry = self._responses.get(key_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._responses[key_id]
+            return None
+        self._responses.move_to_end(key_id)
+        return entry[1]
+
+    def _replay(self, record: dict, request_hash: str) -> dict:
+        if record["request_hash"] != request_hash:
+            self.conflicts += 1
+            raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request")
+        self.replayed += 1
+        return record
+
+    async def claim(self, key_id: str, request_hash: str) -> Optional[dict]:
+        """None if the caller now owns the key and must run the request, else the stored response"""
+        deadline = time.monotonic() + self.wait_seconds
+        db = get_db()
+        while True:
+            record = self._cached(key_id)
+            if record is not None:
+                self.cache_hits += 1
+                return self._replay(record, request_hash)
+
+            running = self._running.get(key_id)
+            if running is not None:
+                # Same worker: wait for the first execution to finish, then look again
+                self.waited += 1
+                try:
+                    await asyncio.wait_for(asyncio.shield(running.wait()), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                continue
+
+            now = datetime.utcnow()
+            claim = {
+                "status": IN_PROGRESS,
+                "request_hash": request_hash,
+                "locked_until": now + timedelta(seconds=self.lock_seconds),
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            }
+            try:
+                await db.idempotency_keys.insert_one({"_id": key_id, **claim})
+                self._running[key_id] = asyncio.Event()
+                return None
+            except DuplicateKeyError:
+                pass
+
+            record = await db.idempotency_keys.find_one({"_id": key_id})
+            if record is None:
+                # Released (or expired) in between; try to claim it again
+                continue
+            if record["status"] == DONE:
+                self._cache(key_id, record)
+                return self._replay(record, request_hash)
+            if record["request_hash"] != request_hash:
+                self.conflicts += 1
+                raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request")
+
+            if record["locked_until"] <= now:
+                # The worker running it went away; take the claim over
+                taken = await db.idempotency_keys.find_one_and_update(
+                    {"_id": key_id, "status": IN_PROGRESS, "locked_until": record["locked_until"]},
+                    {"$set": claim},
+                    return_document=ReturnDocument.AFTER
+                )
+                if taken is not None:
+                    self._running[key_id] = asyncio.Event()
+                    return None
+                continue
+
+            # Another worker is running it: poll until it finishes
+            if time.monotonic() + POLL_SECONDS > deadline:
+                break
+            self.waited += 1
+            await asyncio.sleep(POLL_SECONDS)
+
+        self.conflicts += 1
+        raise IdempotencyConflict(409, "A request with this Idempotency-Key is still being processed")
+
+    async def complete(self, key_id: str, status_code: int, headers: list, body: bytes):
+        """Store the owner's response and wake the duplicates waiting on it"""
+        self.executed += 1
+        record = {
+            "status": DONE,
+            "status_code": status_code,
+            "headers": headers,
+            "body": body,
+            "completed_at": datetime.utcnow()
+        }
+        try:
+            stored = await get_db().idempotency_keys.find_one_and_update(
+                {"_id": key_id, "status": IN_PROGRESS},
+                {"$set": record},
+                return_document=ReturnDocument.AFTER
+            )
+            if stored is not None:
+                self._cache(key_id, stored)
+        except Exception as e:
+            logger.warning(f"Storing idempotent response failed: {e}")
+        finally:
+            self._wake(key_id)
+
+    async def release(self, key_id: str):
+        """Give the key up without a stored response, so a retry runs the request again"""
+        self.released += 1
+        try:
+            await get_db().idempotency_keys.delete_one({"_id": key_id, "status": IN_PROGRESS})
+        except Exception as e:
+            logger.warning(f"Releasing idempotency key failed: {e}")
+        finally:
+            self._wake(key_id)
+
+    def _wake(self, key_id: str):
+        running = self._running.pop(key_id, None)
+        if running is not None:
+            running.set()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._responses),
+            "running": len(self._running),
+            "ttl_seconds": self.ttl_seconds,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "cache_hits": self.cache_hits,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+            "released": self.released
+        }
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,153 @@
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from fastapi import Request
+from pymongo import ReturnDocument
+import math
+import time
+from config.database import get_db
+from config.settings import settings
+
+# Sweep idle keys out of the in-memory table once it grows past this size
+SWEEP_THRESHOLD = 10000
+
+
+def client_ip(request: Request) -> str:
+    """Best-effort client address, honouring X-Forwarded-For from trusted proxies"""
+    hops = settings.TRUSTED_PROXY_HOPS
+    forwarded = request.headers.get("X-Forwarded-For")
+    if hops > 0 and forwarded:
+        addresses = [a.strip() for a in forwarded.split(",") if a.strip()]
+        if addresses:
+            return addresses[-min(hops, len(addresses))]
+    return request.client.host if request.client else "unknown"
+
+
+class LoginThrottle:
+    """Login limiter keyed by email and by client IP that counts failed attempts.
+
+    Runs before any user lookup or bcrypt work: check() reserves an attempt
+    against both budgets, and release() hands it back once the login
+    succeeds. In "memory" mode each worker keeps its own sliding window; in
+    "mongo" mode every worker shares fixed-window counters in the
+    login_attempts collection, reserved atomically with find_one_and_update.
+    """
+
+    def __init__(
+        self,
+        window_seconds: int = 300,
+        max_per_email: int = 10,
+        max_per_ip: int = 50,
+        backend: str = "memory"
+    ):
+        self.window_seconds = window_seconds
+        self.limits = {"email": max_per_email, "ip": max_per_ip}
+        self.backend = backend
+        self._attempts = {}
+        self.allowed = 0
+        self.released = 0
+        self.throttled = {"email": 0, "ip": 0}
+
+    def _keys(self, email: str, ip: str) -> dict:
+        return {"email": f"email:{email.lower()}", "ip": f"ip:{ip}"}
+
+    async def check(self, email: str, ip: str) -> Optional[int]:
+        """Reserve an attempt; return seconds to wait if it is over budget, else None"""
+        keys = self._keys(email, ip)
+        if self.backend == "mongo":
+            retry_after = await self._check_mongo(keys)
+        else:
+            retry_after = self._check_memory(keys)
+
+        if retry_after is None:
+            self.allowed += 1
+        return retry_after
+
+    async def release(self, email: str, ip: str):
+        """Give back the attempt reserved by check(); successful logins do not count"""
+        keys = self._keys(email, ip)
+        self.released += 1
+        if self.backend == "mongo":
+            await self._release_mongo(keys)
+        else:
+            for key in keys.values():
+                window = self._attempts.get(key)
+                if window:
+                    window.pop()
+
+    def _check_memory(self, keys: dict) -> Optional[int]:
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        if len(self._attempts) > SWEEP_THRESHOLD:
+            self._sweep(cutoff)
+
+        windows = {}
+        for kind, key in keys.items():
+            window = self._attempts.setdefault(key, deque())
+            while window and window[0] <= cutoff:
+                window.popleft()
+            if len(window) >= self.limits[kind]:
+                self.throttled[kind] += 1
+                return max(1, math.ceil(window[0] + self.window_seconds - now))
+            windows[kind] = window
+
+        for window in windows.values():
+            window.append(now)
+        return None
+
+    def _sweep(self, cutoff: float):
+        idle = [k for k, w in self._attempts.items() if not w or w[-1] <= cutoff]
+        for key in idle:
+            del self._attempts[key]
+
+    def _window_end(self) -> int:
+        return (int(time.time()) // self.window_seconds + 1) * self.window_seconds
+
+    async def _check_mongo(self, keys: dict) -> Optional[int]:
+        db = get_db()
+        window_end = self._window_end()
+        counts = {}
+        for kind, key in keys.items():
+            doc = await db.login_attempts.find_one_and_update(
+                {"_id": f"{key}:{window_end}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": datetime.utcfromtimestamp(window_end)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            counts[kind] = doc["count"]
+
+        for kind in keys:
+            if counts[kind] > self.limits[kind]:
+                self.throttled[kind] += 1
+                # A rejected attempt is not an attempt
+                await self._release_mongo(keys, window_end)
+                return max(1, math.ceil(window_end - time.time()))
+        return None
+
+    async def _release_mongo(self, keys: dict, window_end: Optional[int] = None):
+        db = get_db()
+        window_end = window_end or self._window_end()
+        for key in keys.values():
+            await db.login_attempts.update_one(
+                {"_id": f"{key}:{window_end}", "count": {"$gt": 0}},
+                {"$inc": {"count": -1}}
+            )
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "window_seconds": self.window_seconds,
+            "limits": self.limits,
+            "allowed": self.allowed,
+            "released": self.released,
+            "throttled_email": self.throttled["email"],
+            "throttled_ip": self.throttled["ip"]
+        }
+
+
+login_throttle = LoginThrottle(
+    window_seconds=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    max_per_email=settings.LOGIN_THROTTLE_MAX_PER_EMAIL,
+    max_per_ip=settings.LOGIN_THROTTLE_MAX_PER_IP,
+    backend=settings.LOGIN_THROTTLE_BACKEND
+)
@@ -0,0 +1,311 @@
+"""Order line items embedded in the order document.
+
+With ORDER_ITEMS_EMBEDDED on, an order's line items live in its `items`
+array together with the service/package name they were priced from. Cart
+edits write the new items and their totals (see order_totals, shared with
+legacy orders) in one find_one_and_update conditional on `items_revision`,
+which counts edits, so totals can no longer drift under concurrent edits.
+
+Orders still stored the old way (rows in `order_items`) are migrated the
+first time they are edited, or in bulk with
+`python manage.py migrate-order-items`. Reads handle both shapes.
+"""
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument, InsertOne, UpdateOne, DeleteOne
+from config.settings import settings
+from services.catalog import catalog
+from services.coupon_cache import coupon_cache
+from models.order import OrderStatus, OrderItemOp, OrderItemOperation
+
+EDITABLE_STATUSES = [OrderStatus.DRAFT, OrderStatus.PENDING]
+# Re-reads of an embedded order before a conflicting edit gives up with 409
+EDIT_ATTEMPTS = 3
+
+
+def is_embedded(order: dict) -> bool:
+    return "items" in order
+
+
+def embedded_item(
+    service_id: Optional[str],
+    package_id: Optional[str],
+    name: Optional[str],
+    quantity: int,
+    unit_price: float,
+    item_id: ObjectId = None
+) -> dict:
+    return {
+        "_id": item_id or ObjectId(),
+        "service_id": service_id,
+        "package_id": package_id,
+        "service_name": name if service_id else None,
+        "package_name": name if package_id else None,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "line_total": unit_price * quantity
+    }
+
+
+async def item_names(items: list):
+    """Service and package names for order_items rows, as two id -> name maps"""
+    services_map, packages_map = {}, {}
+    for item in items:
+        if item.get("service_id"):
+            service = await catalog.service(item["service_id"])
+            if service:
+                services_map[item["service_id"]] = service["name"]
+        elif item.get("package_id"):
+            package = await catalog.package(item["package_id"])
+            if package:
+                packages_map[item["package_id"]] = package["name"]
+    return services_map, packages_map
+
+
+async def migrate_orders(db, orders: list) -> int:
+    """Embed the order_items rows of the given legacy orders; returns how many were migrated.
+
+    Each order is only updated while it still has no `items` field, so this is
+    safe to run while the API is serving cart edits. Totals are left as they are.
+    """
+    legacy = [order for order in orders if not is_embedded(order)]
+    if not legacy:
+        return 0
+
+    order_ids = [str(order["_id"]) for order in legacy]
+    rows = await db.order_items.find({"order_id": {"$in": order_ids}}).to_list(None)
+    services_map, packages_map = await item_names(rows)
+
+    items_by_order = {order_id: [] for order_id in order_ids}
+    for row in rows:
+        name = services_map.get(row.get("service_id")) or packages_map.get(row.get("package_id"))
+        item = embedded_item(row.get("service_id"), row.get("package_id"), name,
+                             row["quantity"], row["unit_price"], item_id=row["_id"])
+        item["line_total"] = row["line_total"]
+        items_by_order[row["order_id"]].append(item)
+
+    result = await db.orders.bulk_write([
+        UpdateOne(
+            {"_id": ObjectId(order_id), "items": {"$exists": False}},
+            {"$set": {"items": items, "items_revision": 0}}
+        )
+        for order_id, items in items_by_order.items()
+    ], ordered=False)
+    return result.modified_count
+
+
+async def migrate_all(db, batch_size: int = 500, purge: bool = False) -> dict:
+    """Embed the items of every legacy order, optionally deleting migrated order_items rows"""
+    migrated = 0
+    while True:
+        orders = await db.orders.find({"items": {"$exists": False}}, {"_id": 1}) \
+            .limit(batch_size).to_list(batch_size)
+        if not orders:
+            break
+        migrated += await migrate_orders(db, orders)
+
+    purged = 0
+    if purge:
+        order_ids = await db.order_items.distinct("order_id")
+        embedded = await db.orders.find(
+            {"_id": {"$in": [ObjectId(i) for i in order_ids]}, "items": {"$exists": True}},
+            {"_id": 1}
+        ).to_list(None)
+        if embedded:
+            result = await db.order_items.delete_many(
+                {"order_id": {"$in": [str(order["_id"]) for order in embedded]}}
+            )
+            purged = result.deleted_count
+
+    return {"migrated": migrated, "purged": purged}
+
+
+async def embed_if_enabled(db, order: dict) -> dict:
+    """In embedded mode, migrate a legacy order before it is written to"""
+    if settings.ORDER_ITEMS_EMBEDDED and not is_embedded(order):
+        await migrate_orders(db, [order])
+        order = await db.orders.find_one({"_id": order["_id"]})
+    return order
+
+
+async def load_editable_order(db, order_id: str, current_user: dict) -> dict:
+    """Fetch an order the user may edit; in embedded mode legacy orders are migrated first"""
+    order = await db.orders.find_one({"_id": ObjectId(order_id)})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if str(order["user_id"]) != current_user["id"] and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    if order["status"] not in EDITABLE_STATUSES:
+        raise HTTPException(status_code=400, detail="Cannot modify this order")
+    return await embed_if_enabled(db, order)
+
+
+def coupon_usable(coupon_doc: Optional[dict]) -> bool:
+    if not coupon_doc or not coupon_doc.get("active"):
+        return False
+    return not (coupon_doc.get("expires_at") and coupon_doc["expires_at"] < datetime.utcnow())
+
+
+def coupon_discount(coupon_doc: dict, subtotal: float) -> float:
+    if coupon_doc["type"] == "percent":
+        return subtotal * (min(coupon_doc["value"], 100) / 100)
+    return min(coupon_doc["value"], subtotal)
+
+
+async def order_totals(subtotal: float, coupon_code: Optional[str]) -> dict:
+    """Totals for an order's subtotal, the same for both storage modes.
+
+    The coupon is re-checked and its discount recomputed from the subtotal,
+    so a percentage stays a percentage as items change; a coupon that is
+    no longer valid is dropped.
+    """
+    tax = 0  # Can implement tax calculation later
+    discount = 0
+    if coupon_code:
+        coupon_doc = await coupon_cache.get(coupon_code)
+        if coupon_usable(coupon_doc):
+            discount = coupon_discount(coupon_doc, subtotal)
+        else:
+            coupon_code = None
+    return {
+        "subtotal": subtotal,
+        "tax": tax,
+        "discount": discount,
+        "total": subtotal - discount + tax,
+        "coupon_code": coupon_code
+    }
+
+
+async def update_items(
+    db, order: dict, items: list, coupon_code: Optional[str], statuses: Optional[list] = EDITABLE_STATUSES
+) -> Optional[dict]:
+    """Store a new item list and its totals, unless the items changed since `order` was read"""
+    totals = await order_totals(sum(i["line_total"] for i in items), coupon_code)
+    query = {"_id": order["_id"], "items_revision": order.get("items_revision", 0)}
+    if statuses is not None:
+        query["status"] = {"$in": statuses}
+    return await db.orders.find_one_and_update(
+        query,
+        {"$set": {"items": items, **totals}, "$inc": {"items_revision": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def edit_items(
+    db, order: dict, edit, coupon_code: Optional[str] = None, statuses: Optional[list] = EDITABLE_STATUSES
+) -> dict:
+    """Apply edit(items) -> items to an editable embedded order and return the result.
+
+    The write is conditional on items_revision; if another edit got there
+    first, the order is re-read and the edit re-applied to the new items.
+    `coupon_code` applies a coupon; otherwise the order's own is kept.
+    `statuses` limits the order statuses it may write to (None: any).
+    """
+    for _ in range(EDIT_ATTEMPTS):
+        updated = await update_items(db, order, edit(order["items"]), coupon_code or order.get("coupon_code"), statuses)
+        if updated is not None:
+            return updated
+        query = {"_id": order["_id"]}
+        if statuses is not None:
+            query["status"] = {"$in": statuses}
+        order = await db.orders.find_one(query)
+        if order is None:
+            raise HTTPException(status_code=400, detail="Cannot modify this order")
+    raise HTTPException(status_code=409, detail="Order was modified concurrently, please retry")
+
+
+async def push_item(db, order: dict, item: dict) -> dict:
+    return await edit_items(db, order, lambda items: items + [item])
+
+
+async def pull_item(db, order: dict, item_id: str) -> dict:
+    def remove(items):
+        if not any(str(i["_id"]) == item_id for i in items):
+            raise HTTPException(status_code=404, detail="Item not found")
+        return [i for i in items if str(i["_id"]) != item_id]
+    return await edit_items(db, order, remove)
+
+
+async def price_lookup(operations: list):
+    """Name and unit price of every service/package added by a batch, from the catalog snapshot"""
+    services_map, packages_map = {}, {}
+    for op in operations:
+        if op.op != OrderItemOp.ADD:
+            continue
+        if op.service_id:
+            service = await catalog.service(op.service_id)
+            if service:
+                services_map[op.service_id] = (service["name"], service["base_price"])
+        elif op.package_id:
+            package = await catalog.package(op.package_id)
+            if package:
+                packages_map[op.package_id] = (package["name"], package["price"])
+    return services_map, packages_map
+
+
+def apply_operations(items: list, operations: list, services_map: dict, packages_map: dict) -> list:
+    """Return the item list that results from applying a batch of cart operations in order"""
+    items = [dict(item) for item in items]
+    for operation in operations:
+        if operation.op == OrderItemOp.ADD:
+            if operation.service_id:
+                priced = services_map.get(operation.service_id)
+                if not priced:
+                    raise HTTPException(status_code=404, detail="Service not found")
+            elif operation.package_id:
+                priced = packages_map.get(operation.package_id)
+                if not priced:
+                    raise HTTPException(status_code=404, detail="Package not found")
+            else:
+                raise HTTPException(status_code=400, detail="Must provide service_id or package_id")
+            name, unit_price = priced
+            items.append(embedded_item(operation.service_id, operation.package_id, name,
+                                       operation.quantity, unit_price))
+            continue
+
+        item = next((i for i in items if str(i["_id"]) == operation.item_id), None)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if operation.op == OrderItemOp.REMOVE:
+            items.remove(item)
+        else:
+            item["quantity"] = operation.quantity
+            item["line_total"] = item["unit_price"] * operation.quantity
+    return items
+
+
+async def write_legacy_items(db, order_id: str, rows: list, items: list):
+    """Persist the difference between order_items rows and a new item list in one bulk write"""
+    before = {row["_id"]: row for row in rows}
+    after = {item["_id"]: item for item in items}
+
+    requests = [DeleteOne({"_id": item_id}) for item_id in before if item_id not in after]
+    for item_id, item in after.items():
+        row = before.get(item_id)
+        if row is None:
+            requests.append(InsertOne({
+                "_id": item_id,
+                "order_id": order_id,
+                "service_id": item["service_id"],
+                "package_id": item["package_id"],
+                "quantity": item["quantity"],
+                "unit_price": item["unit_price"],
+                "line_total": item["line_total"]
+            }))
+        elif row["quantity"] != item["quantity"]:
+            requests.append(UpdateOne(
+                {"_id": item_id},
+                {"$set": {"quantity": item["quantity"], "line_total": item["line_total"]}}
+            ))
+
+    if requests:
+        await db.order_items.bulk_write(requests, ordered=False)
+
+
+async def price_items(items: list) -> list:
+    """Embedded line items for a list of OrderItemCreate, priced from the catalog snapshot"""
+    operations = [OrderItemOperation(op=OrderItemOp.ADD, **item.model_dump()) for item in items]
+    services_map, packages_map = await price_lookup(operations)
+    return apply_operations([], operations, services_map, packages_map)
@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response
+import base64
+import binascii
+import json
+
+# Response header carrying the cursor for the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value, doc_id: ObjectId) -> str:
+    """Opaque cursor for the position right after (sort_value, _id)"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"$date": sort_value.isoformat()}
+    raw = json.dumps([sort_value, str(doc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, dict) and "$date" in sort_value:
+            sort_value = datetime.fromisoformat(sort_value["$date"])
+        return sort_value, ObjectId(doc_id)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    collection,
+    query: dict,
+    sort_key: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str],
+    response: Response,
+    projection: Optional[dict] = None
+) -> list:
+    """Keyset pagination on (sort_key, _id).
+
+    Each page is an index range scan starting after the cursor position, so
+    deep pages cost the same as the first one. Sets NEXT_CURSOR_HEADER on the
+    response when more results exist; the frontend's api.requestAll() follows
+    it to load whole lists.
+    """
+    if cursor:
+        sort_value, doc_id = decode_cursor(cursor)
+        op = "$lt" if direction < 0 else "$gt"
+        # Documents without the sort field (or with null) sort before all others
+        if sort_value is None:
+            after = [{sort_key: None, "_id": {op: doc_id}}]
+            if direction > 0:
+                after.append({sort_key: {"$ne": None}})
+        else:
+            after = [{sort_key: {op: sort_value}}, {sort_key: sort_value, "_id": {op: doc_id}}]
+            if direction < 0:
+                after.append({sort_key: None})
+        after = {"$or": after}
+        query = {"$and": [query, after]} if query else after
+
+    docs = await collection.find(query, projection) \
+        .sort([(sort_key, direction), ("_id", direction)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.get(sort_key), last["_id"])
+    return docs
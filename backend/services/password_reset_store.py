@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+import hashlib
+import secrets
+from config.database import get_db
+from config.settings import settings
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class PasswordResetStore:
+    """Password reset tokens stored as SHA-256 digests in password_resets.
+
+    Records carry an `expires_at` covered by a TTL index, so MongoDB removes
+    them on its own, and a unique index on `token_hash` keeps lookups to a
+    single index probe.
+    """
+
+    def __init__(self, ttl_minutes: int = 60):
+        self.ttl_minutes = ttl_minutes
+
+    async def issue(self, user_id: ObjectId) -> str:
+        """Create a reset token for a user and return the raw value to email"""
+        db = get_db()
+        token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        await db.password_resets.insert_one({
+            "user_id": user_id,
+            "token_hash": token_digest(token),
+            "used": False,
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=self.ttl_minutes)
+        })
+        return token
+
+    async def consume(self, token: str) -> Optional[ObjectId]:
+        """Atomically mark a valid token used; return its user id, or None if invalid"""
+        db = get_db()
+        now = datetime.utcnow()
+        record = await db.password_resets.find_one_and_update(
+            {
+                "token_hash": token_digest(token),
+                "used": False,
+                "expires_at": {"$gt": now}
+            },
+            {"$set": {"used": True, "used_at": now}},
+            projection={"user_id": 1}
+        )
+        return record["user_id"] if record else None
+
+    async def release(self, token: str):
+        """Make a consumed token usable again when the reset could not be completed"""
+        db = get_db()
+        await db.password_resets.update_one(
+            {"token_hash": token_digest(token), "used": True},
+            {"$set": {"used": False}, "$unset": {"used_at": ""}}
+        )
+
+
+password_reset_store = PasswordResetStore(ttl_minutes=settings.PASSWORD_RESET_TTL_MINUTES)
@@ -0,0 +1,213 @@
+"""Payment provider interface and the Stripe implementation.
+
+Routes only talk to `payment_provider`, in the provider-neutral types from
+models/payment.py. PAYMENT_PROVIDER picks the implementation: "stripe"
+(default) or "fake", the in-process stand-in from
+services/fake_payment_provider.py for offline load and latency testing.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import time
+from config.settings import settings
+from models.payment import (
+    ProviderCheckoutRequest, ProviderCheckoutSession, ProviderCheckoutStatus, ProviderWebhookEvent
+)
+from services.metrics import LatencyStats
+
+# StripeCheckout clients kept by StripeProvider, one per webhook URL
+MAX_CLIENTS = 4
+
+
+class ProviderError(Exception):
+    """A provider call failed (network, provider-side or invalid input)"""
+
+
+class SessionNotFound(ProviderError):
+    """The provider has no such checkout session (other account or mode, or it was purged)"""
+
+
+def configure_stripe_http(timeout_seconds: float, max_retries: int, pool_size: int):
+    """Point the stripe SDK at one keep-alive connection pool with our timeout and retry policy.
+
+    Sets the pooled client as stripe.default_http_client, which every request
+    made through the SDK's module-level API uses (stripe.checkout.Session and
+    friends, as called by emergentintegrations' StripeCheckout). Returns it.
+    """
+    from requests.adapters import HTTPAdapter
+    import requests
+    import stripe
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    http_client = stripe.RequestsClient(
+        timeout=timeout_seconds,
+        session=session,
+        async_fallback_client=stripe.HTTPXClient(timeout=timeout_seconds)
+    )
+    stripe.default_http_client = http_client
+    # Retries reuse the SDK's idempotency keys, so POSTs are safe to retry
+    stripe.max_network_retries = max_retries
+    return http_client
+
+
+class PaymentProvider(ABC):
+    """Base class: per-operation latency and failure stats around every call.
+
+    Implementations provide the _create_checkout_session, _get_checkout_status
+    and _handle_webhook hooks and raise ProviderError when a call fails; the
+    public methods wrap them in _timed.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.latency = {}
+        self.failures = {}
+
+    async def _timed(self, operation: str, call):
+        started_at = time.perf_counter()
+        try:
+            return await call
+        except ProviderError:
+            self.failures[operation] = self.failures.get(operation, 0) + 1
+            raise
+        except Exception as e:
+            self.failures[operation] = self.failures.get(operation, 0) + 1
+            raise ProviderError(f"{type(e).__name__}: {e}") from e
+        finally:
+            stats = self.latency.get(operation)
+            if stats is None:
+                stats = self.latency[operation] = LatencyStats()
+            stats.record((time.perf_counter() - started_at) * 1000)
+
+    @abstractmethod
+    async def _create_checkout_session(self, webhook_url: str, request: ProviderCheckoutRequest) -> ProviderCheckoutSession:
+        ...
+
+    @abstractmethod
+    async def _get_checkout_status(self, webhook_url: str, session_id: str) -> ProviderCheckoutStatus:
+        ...
+
+    @abstractmethod
+    async def _handle_webhook(self, webhook_url: str, body: bytes, signature: str) -> ProviderWebhookEvent:
+        ...
+
+    async def create_checkout_session(self, webhook_url: str, request: ProviderCheckoutRequest) -> ProviderCheckoutSession:
+        return await self._timed("create_checkout_session", self._create_checkout_session(webhook_url, request))
+
+    async def get_checkout_status(self, webhook_url: str, session_id: str) -> ProviderCheckoutStatus:
+        return await self._timed("get_checkout_status", self._get_checkout_status(webhook_url, session_id))
+
+    async def handle_webhook(self, webhook_url: str, body: bytes, signature: str) -> ProviderWebhookEvent:
+        return await self._timed("handle_webhook", self._handle_webhook(webhook_url, body, signature))
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "latency": {op: stats.snapshot() for op, stats in self.latency.items()},
+            "failures": dict(self.failures)
+        }
+
+
+class StripeProvider(PaymentProvider):
+    """Long-lived Stripe checkout clients shared by every request.
+
+    One StripeCheckout per webhook URL is built on first use and reused (the
+    routes only ever pass the one built from PUBLIC_API_URL; at most
+    MAX_CLIENTS are kept regardless), and the stripe SDK underneath talks
+    through a single pooled HTTP session, so calls after the first skip
+    connection and TLS setup.
+    """
+
+    name = "stripe"
+
+    def __init__(self, api_key: str, timeout_seconds: float = 10, max_retries: int = 2, pool_size: int = 10):
+        super().__init__()
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self._clients: "OrderedDict[str, object]" = OrderedDict()
+        self._http_client = None
+
+    def _client(self, webhook_url: str):
+        from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+        if self._http_client is None:
+            self._http_client = configure_stripe_http(self.timeout_seconds, self.max_retries, self.pool_size)
+        client = self._clients.get(webhook_url)
+        if client is None:
+            client = self._clients[webhook_url] = StripeCheckout(api_key=self.api_key, webhook_url=webhook_url)
+            while len(self._clients) > MAX_CLIENTS:
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(webhook_url)
+        return client
+
+    async def _create_checkout_session(self, webhook_url: str, request: ProviderCheckoutRequest) -> ProviderCheckoutSession:
+        from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
+
+        session = await self._client(webhook_url).create_checkout_session(CheckoutSessionRequest(
+            amount=request.amount,
+            currency=request.currency,
+            success_url=request.success_url,
+            cancel_url=request.cancel_url,
+            metadata=request.metadata
+        ))
+        return ProviderCheckoutSession(session_id=session.session_id, url=session.url)
+
+    async def _get_checkout_status(self, webhook_url: str, session_id: str) -> ProviderCheckoutStatus:
+        try:
+            status = await self._client(webhook_url).get_checkout_status(session_id)
+        except Exception as e:
+            # stripe.InvalidRequestError, possibly re-raised by emergentintegrations with only the message
+            if getattr(e, "code", None) == "resource_missing" or "No such checkout" in str(e):
+                raise SessionNotFound(str(e)) from e
+            raise
+        return ProviderCheckoutStatus(
+            status=status.status,
+            payment_status=status.payment_status,
+            amount_total=status.amount_total,
+            currency=status.currency,
+            metadata=status.metadata or {}
+        )
+
+    async def _handle_webhook(self, webhook_url: str, body: bytes, signature: str) -> ProviderWebhookEvent:
+        event = await self._client(webhook_url).handle_webhook(body, signature)
+        return ProviderWebhookEvent(
+            event_id=event.event_id,
+            event_type=event.event_type,
+            session_id=event.session_id,
+            payment_status=event.payment_status,
+            metadata=event.metadata or {}
+        )
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "timeout_seconds": self.timeout_seconds,
+            "max_retries": self.max_retries,
+            "pool_size": self.pool_size,
+            "clients": len(self._clients)
+        }
+
+
+def create_payment_provider(name: str) -> PaymentProvider:
+    if name == "fake":
+        from services.fake_payment_provider import FakePaymentProvider
+        return FakePaymentProvider(
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET or "whsec_fake",
+            latency_ms=settings.FAKE_PAYMENT_LATENCY_MS,
+            jitter_ms=settings.FAKE_PAYMENT_JITTER_MS,
+            failure_rate=settings.FAKE_PAYMENT_FAILURE_RATE
+        )
+    if name == "stripe":
+        return StripeProvider(
+            api_key=settings.STRIPE_API_KEY,
+            timeout_seconds=settings.STRIPE_TIMEOUT_SECONDS,
+            max_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+            pool_size=settings.STRIPE_POOL_SIZE
+        )
+    raise ValueError(f"Unknown PAYMENT_PROVIDER {name!r}")
+
+
+payment_provider = create_payment_provider(settings.PAYMENT_PROVIDER)
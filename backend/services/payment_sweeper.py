@@ -0,0 +1,156 @@
+"""Background reconciliation of payment transactions stuck before payment.
+
+Every `interval_seconds` one worker (holding the `payment_sweeper` lease,
+see config/bootstrap.py) loads transactions still initiated/pending
+`stale_seconds` after creation, oldest first, and hands each to the
+reconcile handler, which asks the provider and finalizes or expires it.
+Provider calls are bounded both in concurrency and in rate. A transaction
+whose check fails is skipped until its `next_check_at`, backing off
+exponentially, so a pile of failing ones cannot starve newer ones.
+"""
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+from config.bootstrap import acquire_lease, WORKER_ID
+from config.database import get_db
+from config.settings import settings
+from models.payment import PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = [PaymentStatus.INITIATED, PaymentStatus.PENDING]
+# Longest wait before re-checking a transaction whose checks keep failing
+MAX_BACKOFF_SECONDS = 86400
+
+
+class PaymentSweeper:
+    def __init__(
+        self,
+        interval_seconds: float = 300,
+        stale_seconds: float = 600,
+        batch_size: int = 200,
+        concurrency: int = 4,
+        rate_per_second: float = 5
+    ):
+        self.interval_seconds = interval_seconds
+        self.stale_seconds = stale_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_per_second = rate_per_second
+        self._reconcile = None
+        self._task = None
+        self._next_slot = 0.0
+        self.sweeps = 0
+        self.last_sweep = None
+
+    async def _rate_limit(self):
+        """Space provider calls at least 1 / rate_per_second apart"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate_per_second
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def sweep(self) -> dict:
+        """Reconcile one batch of stale open transactions; returns the sweep report"""
+        db = get_db()
+        started_at = time.perf_counter()
+        now = datetime.utcnow()
+        query = {
+            "status": {"$in": OPEN_STATUSES},
+            "created_at": {"$lt": now - timedelta(seconds=self.stale_seconds)},
+            # Not backing off after a failed check
+            "next_check_at": {"$not": {"$gt": now}}
+        }
+        backlog = await db.payment_transactions.count_documents(query)
+        transactions = await db.payment_transactions.find(query) \
+            .sort("created_at", 1).limit(self.batch_size).to_list(self.batch_size)
+
+        report = {"backlog": backlog, "checked": 0, "paid": 0, "expired": 0, "pending": 0, "errors": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def reconcile(transaction):
+            async with semaphore:
+                await self._rate_limit()
+                try:
+                    result = await self._reconcile(transaction)
+                except Exception as e:
+                    report["errors"] += 1
+                    logger.warning(f"Reconciling payment {transaction['session_id']} failed: {e}")
+                    await self._back_off(db, transaction, e)
+                    return
+                report["checked"] += 1
+                if result["payment_status"] == "paid":
+                    report["paid"] += 1
+                elif result["status"] == "expired":
+                    report["expired"] += 1
+                else:
+                    report["pending"] += 1
+
+        await asyncio.gather(*[reconcile(t) for t in transactions])
+
+        report["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+        report["finished_at"] = datetime.utcnow()
+        self.sweeps += 1
+        self.last_sweep = report
+        if transactions:
+            logger.info(f"Payment sweep: {report}")
+        return report
+
+    async def _back_off(self, db, transaction: dict, error: Exception):
+        attempts = transaction.get("reconcile_attempts", 0) + 1
+        delay = min(self.interval_seconds * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        try:
+            await db.payment_transactions.update_one(
+                {"_id": transaction["_id"]},
+                {"$set": {
+                    "reconcile_attempts": attempts,
+                    "next_check_at": datetime.utcnow() + timedelta(seconds=delay),
+                    "last_reconcile_error": f"{type(error).__name__}: {error}"
+                }}
+            )
+        except Exception as e:
+            logger.warning(f"Recording the failed check of {transaction['session_id']} failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                # Lease outlives one interval so only a dead leader is replaced
+                if await acquire_lease(get_db(), "payment_sweeper", int(self.interval_seconds * 2), WORKER_ID):
+                    await self.sweep()
+            except Exception as e:
+                logger.warning(f"Payment sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, reconcile):
+        """Start sweeping; reconcile(transaction) returns the provider's checkout status"""
+        self._reconcile = reconcile
+        if self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval_seconds,
+            "stale_seconds": self.stale_seconds,
+            "concurrency": self.concurrency,
+            "rate_per_second": self.rate_per_second,
+            "sweeps": self.sweeps,
+            "last_sweep": self.last_sweep
+        }
+
+
+payment_sweeper = PaymentSweeper(
+    interval_seconds=settings.PAYMENT_SWEEP_INTERVAL_SECONDS,
+    stale_seconds=settings.PAYMENT_SWEEP_STALE_SECONDS,
+    batch_size=settings.PAYMENT_SWEEP_BATCH_SIZE,
+    concurrency=settings.PAYMENT_SWEEP_CONCURRENCY,
+    rate_per_second=settings.PAYMENT_SWEEP_RATE_PER_SECOND
+)
@@ -0,0 +1,89 @@
+from pymongo import monitoring
+import threading
+import time
+from services.metrics import LatencyStats
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool listener reporting checkout wait time and pool occupancy.
+
+    Checkout wait is the time between a thread asking the pool for a
+    connection and getting one, i.e. queueing for a connection as opposed to
+    time spent on the server (which services.db_profiler measures).
+    """
+
+    def __init__(self):
+        self.checkout_wait = LatencyStats()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.checkout_failures = {}
+        self.pool_clears = 0
+
+    def _adjust(self, attr: str, delta: int):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+            if self.checked_out > self.max_checked_out:
+                self.max_checked_out = self.checked_out
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._adjust("pool_clears", 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._adjust("created", 1)
+        self._adjust("open_connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._adjust("closed", 1)
+        self._adjust("open_connections", -1)
+
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._local.started_at = None
+        reason = str(event.reason)
+        with self._lock:
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        started_at = getattr(self._local, "started_at", None)
+        if started_at is not None:
+            self.checkout_wait.record((time.perf_counter() - started_at) * 1000)
+            self._local.started_at = None
+        self._adjust("checked_out", 1)
+
+    def connection_checked_in(self, event):
+        self._adjust("checked_out", -1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "pool_clears": self.pool_clears,
+                "checkout_failures": dict(self.checkout_failures),
+                "checkout_wait": self.checkout_wait.snapshot()
+            }
+
+
+pool_monitor = PoolMonitor()
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+import asyncio
+import time
+from config.database import get_db
+from config.settings import settings
+
+# Overlap between incremental syncs so writes from workers with slightly
+# skewed clocks are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class TokenVersionStore:
+    """In-process mirror of the token_versions collection.
+
+    Each document is {_id: user_id, version, updated_at}. A user without a
+    document is at version 0. Bumping the version revokes every token issued
+    before the bump. The mirror is refreshed incrementally every
+    `refresh_seconds`, and immediately when a token claims a newer version
+    than the one we know about.
+    """
+
+    def __init__(self, refresh_seconds: int = 30):
+        self.refresh_seconds = refresh_seconds
+        self._versions = {}
+        self._synced_at = None
+        self._refreshed_at = None
+        self._lock = None
+        self.refreshes = 0
+        self.revoked = 0
+
+    async def _refresh(self):
+        db = get_db()
+        query = {} if self._synced_at is None else {"updated_at": {"$gte": self._synced_at}}
+        started_at = datetime.utcnow()
+        docs = await db.token_versions.find(query, {"version": 1}).to_list(None)
+        for doc in docs:
+            self._versions[doc["_id"]] = doc["version"]
+        self._synced_at = started_at - SYNC_OVERLAP
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+
+    async def _refresh_if(self, predicate):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if predicate():
+                await self._refresh()
+
+    def _is_stale(self) -> bool:
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at > self.refresh_seconds
+        )
+
+    async def get(self, user_id: str) -> int:
+        if self._is_stale():
+            await self._refresh_if(self._is_stale)
+        return self._versions.get(user_id, 0)
+
+    async def fetch(self, user_id: str) -> int:
+        """The user's version read from Mongo, bypassing the mirror"""
+        db = get_db()
+        doc = await db.token_versions.find_one({"_id": user_id}, {"version": 1})
+        version = doc["version"] if doc else 0
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+        return version
+
+    async def is_current(self, user_id: str, version: int) -> bool:
+        current = await self.get(user_id)
+        if version > current:
+            # Token was issued after a bump we have not seen yet
+            await self._refresh_if(lambda: version > self._versions.get(user_id, 0))
+            current = self._versions.get(user_id, 0)
+        if version != current:
+            self.revoked += 1
+            return False
+        return True
+
+    async def bump(self, user_id: str) -> int:
+        db = get_db()
+        doc = await db.token_versions.find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._versions[user_id] = doc["version"]
+        return doc["version"]
+
+    def stats(self) -> dict:
+        return {
+            "tracked_users": len(self._versions),
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "revoked": self.revoked
+        }
+
+
+token_versions = TokenVersionStore(refresh_seconds=settings.TOKEN_VERSION_REFRESH_SECONDS)
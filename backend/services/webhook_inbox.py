@@ -0,0 +1,206 @@
+"""Durable inbox for payment provider webhooks.
+
+The webhook endpoint only verifies the event and records it here, keyed by
+the provider's event id (so redeliveries are dropped), then acknowledges.
+A pool of background workers claims pending events with a conditional
+find_one_and_update and runs the handler. Failures are retried with
+exponential backoff; after `max_attempts` the event is dead-lettered
+(status "dead") and kept for inspection. A claim is a lease: if a worker
+dies mid-event, the event becomes claimable again when the lease runs out,
+unless that was its last attempt, in which case it is dead-lettered too.
+"""
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import logging
+import time
+from config.database import get_db
+from config.settings import settings
+from services.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+DEAD = "dead"
+
+
+class WebhookInbox:
+    def __init__(
+        self,
+        workers: int = 4,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 5,
+        lease_seconds: float = 60,
+        poll_seconds: float = 5
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._handler = None
+        self._tasks = []
+        self._wakeup = None
+        self.processing_time = LatencyStats()
+        self.received = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    async def record(self, event_id: str, event_type: str, data: dict, payload: str) -> bool:
+        """Store a verified event; False if it was already received"""
+        db = get_db()
+        now = datetime.utcnow()
+        try:
+            await db.webhook_events.insert_one({
+                "_id": event_id,
+                "event_type": event_type,
+                "data": data,
+                "payload": payload,
+                "status": PENDING,
+                "attempts": 0,
+                "received_at": now,
+                "next_attempt_at": now
+            })
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return False
+        self.received += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def _claim(self, db):
+        now = datetime.utcnow()
+        return await db.webhook_events.find_one_and_update(
+            {
+                "status": {"$in": [PENDING, PROCESSING]},
+                "next_attempt_at": {"$lte": now},
+                "attempts": {"$lt": self.max_attempts}
+            },
+            {
+                "$set": {"status": PROCESSING, "next_attempt_at": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _expire_leases(self, db):
+        """Dead-letter events whose last attempt's lease ran out without settling them"""
+        now = datetime.utcnow()
+        result = await db.webhook_events.update_many(
+            {"status": PROCESSING, "next_attempt_at": {"$lte": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": DEAD, "last_error": "Lease expired on the last attempt", "failed_at": now}}
+        )
+        if result.modified_count:
+            self.dead_lettered += result.modified_count
+            logger.error(f"{result.modified_count} webhook event(s) dead-lettered after their last lease expired")
+
+    async def _process(self, db, event: dict):
+        started_at = time.perf_counter()
+        try:
+            await self._handler(event)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if event["attempts"] >= self.max_attempts:
+                self.dead_lettered += 1
+                logger.error(f"Webhook event {event['_id']} dead-lettered after {event['attempts']} attempts: {error}")
+                update = {"status": DEAD, "last_error": error, "failed_at": datetime.utcnow()}
+            else:
+                self.retried += 1
+                delay = self.retry_base_seconds * 2 ** (event["attempts"] - 1)
+                logger.warning(f"Webhook event {event['_id']} failed (attempt {event['attempts']}), retrying in {delay:.0f}s: {error}")
+                update = {
+                    "status": PENDING,
+                    "last_error": error,
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)
+                }
+        else:
+            self.processed += 1
+            update = {"status": DONE, "completed_at": datetime.utcnow()}
+        finally:
+            self.processing_time.record((time.perf_counter() - started_at) * 1000)
+
+        # Only if we still hold the claim (attempts is bumped by every claim)
+        await db.webhook_events.update_one(
+            {"_id": event["_id"], "status": PROCESSING, "attempts": event["attempts"]},
+            {"$set": update}
+        )
+
+    async def _run(self):
+        db = get_db()
+        while True:
+            try:
+                event = await self._claim(db)
+                if event is None:
+                    await self._expire_leases(db)
+            except Exception as e:
+                logger.warning(f"Webhook inbox claim failed: {e}")
+                event = None
+
+            if event is not None:
+                try:
+                    await self._process(db, event)
+                except Exception as e:
+                    # The claim lapses and the event is picked up again
+                    logger.warning(f"Webhook event {event['_id']} could not be settled: {e}")
+                continue
+
+            if self._wakeup.is_set():
+                # Something arrived while we were claiming; look again
+                self._wakeup.clear()
+                continue
+
+            # Nothing due: sleep until a new event arrives or the next poll
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, handler):
+        """Start the worker pool; handler(event) is awaited for each event"""
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def redrive(self, event_id: str) -> bool:
+        """Put a dead-lettered event back in the queue"""
+        db = get_db()
+        result = await db.webhook_events.update_one(
+            {"_id": event_id, "status": DEAD},
+            {"$set": {"status": PENDING, "attempts": 0, "next_attempt_at": datetime.utcnow()}}
+        )
+        if result.modified_count and self._wakeup is not None:
+            self._wakeup.set()
+        return bool(result.modified_count)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "processing_time": self.processing_time.snapshot()
+        }
+
+
+webhook_inbox = WebhookInbox(
+    workers=settings.WEBHOOK_WORKERS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retry_base_seconds=settings.WEBHOOK_RETRY_BASE_SECONDS,
+    lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+    poll_seconds=settings.WEBHOOK_POLL_SECONDS
+)
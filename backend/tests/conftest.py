@@ -0,0 +1,43 @@
+"""Fixtures for the in-process tests, which run against mongomock instead of a deployed API."""
+import os
+import sys
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config.database
+from services.catalog import catalog
+from services.checkout_status import checkout_status_cache
+from services.coupon_cache import coupon_cache
+from services.idempotency import idempotency_store
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh in-memory database behind get_db(), with the per-process caches emptied"""
+    database = AsyncMongoMockClient()["ccc_test"]
+    monkeypatch.setattr(config.database, "db", database)
+    catalog.__init__(check_seconds=catalog.check_seconds)
+    coupon_cache.__init__(
+        ttl_seconds=coupon_cache.ttl_seconds,
+        negative_ttl_seconds=coupon_cache.negative_ttl_seconds,
+        max_entries=coupon_cache.max_entries,
+        check_seconds=coupon_cache.check_seconds
+    )
+    checkout_status_cache.__init__(
+        ttl_seconds=checkout_status_cache.ttl_seconds,
+        max_entries=checkout_status_cache.max_entries
+    )
+    idempotency_store.__init__(
+        ttl_seconds=idempotency_store.ttl_seconds,
+        lock_seconds=idempotency_store.lock_seconds,
+        wait_seconds=idempotency_store.wait_seconds,
+        max_entries=idempotency_store.max_entries
+    )
+    return database
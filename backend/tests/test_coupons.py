@@ -0,0 +1,62 @@
+"""Applying coupons to orders, and coupon values admins may set"""
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pydantic import ValidationError
+from config.settings import settings
+from models.order import OrderCreate, OrderItemCreate, ApplyCouponRequest, OrderStatus
+from routes import admin, orders
+
+pytestmark = pytest.mark.anyio
+
+MODES = [pytest.param(True, id="embedded"), pytest.param(False, id="legacy")]
+ADMIN = {"id": str(ObjectId()), "email": "admin@example.com", "name": "Admin", "role": "admin"}
+
+
+@pytest.fixture
+async def order(db):
+    user = {"id": str(ObjectId()), "email": "client@example.com", "name": "Client", "role": "client"}
+    service = await db.services.insert_one({"name": "Landing Page", "base_price": 100.0, "active": True})
+    await db.coupons.insert_one({"code": "TENOFF", "type": "percent", "value": 10, "active": True})
+    return user, OrderItemCreate(service_id=str(service.inserted_id))
+
+
+@pytest.mark.parametrize("embedded", MODES)
+async def test_only_the_owner_applies_coupons(db, order, monkeypatch, embedded):
+    monkeypatch.setattr(settings, "ORDER_ITEMS_EMBEDDED", embedded)
+    user, item = order
+    created = await orders.create_order(OrderCreate(items=[item]), user)
+
+    with pytest.raises(HTTPException) as raised:
+        await orders.apply_coupon(created.id, ApplyCouponRequest(code="TENOFF"), ADMIN)
+    assert raised.value.status_code == 403
+
+
+@pytest.mark.parametrize("embedded", MODES)
+async def test_coupon_applies_whatever_the_order_status(db, order, monkeypatch, embedded):
+    monkeypatch.setattr(settings, "ORDER_ITEMS_EMBEDDED", embedded)
+    user, item = order
+    created = await orders.create_order(OrderCreate(items=[item]), user)
+    await db.orders.update_one({"_id": ObjectId(created.id)}, {"$set": {"status": OrderStatus.PAID}})
+
+    applied = await orders.apply_coupon(created.id, ApplyCouponRequest(code="TENOFF"), user)
+    assert (applied["discount"], applied["new_total"]) == (10.0, 90.0)
+
+
+def test_percent_coupon_value_is_capped():
+    with pytest.raises(ValidationError):
+        admin.CouponCreate(code="HALFPLUS", type="percent", value=150)
+    assert admin.CouponCreate(code="BIGFIXED", type="fixed", value=150).value == 150
+
+
+async def test_update_cannot_push_percent_coupon_over_100(db):
+    await admin.create_coupon(admin.CouponCreate(code="TENOFF", type="percent", value=10), ADMIN)
+    await admin.create_coupon(admin.CouponCreate(code="FLAT30", type="fixed", value=30), ADMIN)
+
+    with pytest.raises(HTTPException) as raised:
+        await admin.update_coupon("tenoff", admin.CouponUpdate(value=120), ADMIN)
+    assert raised.value.status_code == 400
+    assert (await admin.update_coupon("flat30", admin.CouponUpdate(value=120), ADMIN))["value"] == 120
+    with pytest.raises(HTTPException) as raised:
+        await admin.update_coupon("missing", admin.CouponUpdate(value=120), ADMIN)
+    assert raised.value.status_code == 404
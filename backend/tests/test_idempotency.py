@@ -0,0 +1,178 @@
+"""Idempotency-Key middleware: replays, conflicts and duplicates of a request still running"""
+import asyncio
+from datetime import datetime, timedelta
+import hashlib
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from middleware.auth import create_access_token
+from middleware.idempotency import IdempotencyMiddleware, REPLAYED_HEADER
+from services.idempotency import idempotency_store, record_id, IN_PROGRESS
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = str(ObjectId())
+
+
+def auth(user_id: str = USER_ID) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user_id, 'role': 'client'})}"}
+
+
+@pytest.fixture
+def api(db):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware)
+    app.state.calls = 0
+    app.state.gate = None
+
+    @app.post("/things", status_code=201)
+    async def create_thing(payload: dict):
+        app.state.calls += 1
+        if app.state.gate is not None:
+            await app.state.gate.wait()
+        return {"n": app.state.calls, **payload}
+
+    @app.post("/broken")
+    async def broken():
+        app.state.calls += 1
+        raise RuntimeError("boom")
+
+    @app.post("/api/auth/login")
+    async def login():
+        app.state.calls += 1
+        return {"access_token": f"token-{app.state.calls}"}
+
+    return app
+
+
+@pytest.fixture
+async def client(api):
+    transport = httpx.ASGITransport(app=api, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=auth()) as client:
+        yield client
+
+
+async def test_retry_replays_stored_response(api, client):
+    first = await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+    retry = await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"n": 1, "name": "a"}
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert REPLAYED_HEADER not in first.headers
+    assert api.state.calls == 1
+
+
+async def test_replay_from_another_worker_reads_mongo(api, client):
+    await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+    # A worker that never saw the first request has nothing in its LRU
+    idempotency_store._responses.clear()
+
+    retry = await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+    assert retry.json() == {"n": 1, "name": "a"}
+    assert api.state.calls == 1
+
+
+async def test_key_reused_for_different_body_is_rejected(api, client):
+    await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+    other = await client.post("/things", json={"name": "b"}, headers={"Idempotency-Key": "k1"})
+
+    assert other.status_code == 422
+    assert api.state.calls == 1
+
+
+async def test_keys_are_scoped_to_the_user(api, client):
+    await client.post("/things", json={}, headers={"Idempotency-Key": "k1"})
+    await client.post("/things", json={}, headers={"Idempotency-Key": "k1", **auth(str(ObjectId()))})
+    assert api.state.calls == 2
+
+    # Same user with a newly issued token: still a retry
+    await client.post("/things", json={}, headers={"Idempotency-Key": "k1", **auth()})
+    assert api.state.calls == 2
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer not-a-jwt", "Basic dXNlcjpwYXNz"])
+async def test_unauthenticated_requests_are_not_stored(db, api, client, authorization):
+    client.headers.pop("Authorization")
+    headers = {"Idempotency-Key": "k1"}
+    if authorization:
+        headers["Authorization"] = authorization
+    for _ in range(2):
+        await client.post("/things", json={}, headers=headers)
+    assert api.state.calls == 2
+    assert await db.idempotency_keys.count_documents({}) == 0
+
+
+async def test_credential_responses_are_not_stored(db, api, client):
+    first = await client.post("/api/auth/login", headers={"Idempotency-Key": "k1"})
+    retry = await client.post("/api/auth/login", headers={"Idempotency-Key": "k1"})
+    assert first.json() != retry.json()
+    assert REPLAYED_HEADER not in retry.headers
+    assert await db.idempotency_keys.count_documents({}) == 0
+
+
+async def test_concurrent_duplicate_waits_for_first(api, client):
+    api.state.gate = asyncio.Event()
+    first = asyncio.create_task(client.post("/things", json={}, headers={"Idempotency-Key": "k1"}))
+    while api.state.calls == 0:
+        await asyncio.sleep(0.01)
+    duplicate = asyncio.create_task(client.post("/things", json={}, headers={"Idempotency-Key": "k1"}))
+    await asyncio.sleep(0.05)
+    assert not duplicate.done()
+
+    api.state.gate.set()
+    first, duplicate = await first, await duplicate
+    assert duplicate.json() == first.json() == {"n": 1}
+    assert duplicate.headers[REPLAYED_HEADER] == "true"
+    assert api.state.calls == 1
+
+
+async def test_duplicate_gets_409_while_first_still_runs(api, client, monkeypatch):
+    monkeypatch.setattr(idempotency_store, "wait_seconds", 0.2)
+    api.state.gate = asyncio.Event()
+    first = asyncio.create_task(client.post("/things", json={}, headers={"Idempotency-Key": "k1"}))
+    while api.state.calls == 0:
+        await asyncio.sleep(0.01)
+
+    duplicate = await client.post("/things", json={}, headers={"Idempotency-Key": "k1"})
+    assert duplicate.status_code == 409
+
+    api.state.gate.set()
+    assert (await first).status_code == 201
+    assert api.state.calls == 1
+
+
+async def test_claim_held_by_another_worker(db, api, client, monkeypatch):
+    monkeypatch.setattr(idempotency_store, "wait_seconds", 0.2)
+    now = datetime.utcnow()
+    await db.idempotency_keys.insert_one({
+        "_id": record_id(USER_ID, "POST", "/things", "k1"),
+        "status": IN_PROGRESS,
+        "request_hash": hashlib.sha256(b"{}").hexdigest(),
+        "locked_until": now + timedelta(seconds=60),
+        "created_at": now,
+        "expires_at": now + timedelta(days=1)
+    })
+
+    response = await client.post("/things", content=b"{}", headers={
+        "Idempotency-Key": "k1", "Content-Type": "application/json"
+    })
+    assert response.status_code == 409
+    assert api.state.calls == 0
+
+    # Once that worker's lock lapses the claim is taken over and the request runs
+    await db.idempotency_keys.update_one({}, {"$set": {"locked_until": now - timedelta(seconds=1)}})
+    response = await client.post("/things", content=b"{}", headers={
+        "Idempotency-Key": "k1", "Content-Type": "application/json"
+    })
+    assert response.status_code == 201
+    assert api.state.calls == 1
+
+
+async def test_server_error_releases_key(db, api, client):
+    for _ in range(2):
+        response = await client.post("/broken", headers={"Idempotency-Key": "k1"})
+        assert response.status_code == 500
+    assert api.state.calls == 2
+    assert await db.idempotency_keys.count_documents({}) == 0
@@ -0,0 +1,48 @@
+"""Login throttling counts failed attempts per email and per IP, in both backends"""
+import pytest
+from services.login_throttle import LoginThrottle
+
+pytestmark = pytest.mark.anyio
+
+BACKENDS = ["memory", "mongo"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_email_budget(db, backend):
+    throttle = LoginThrottle(max_per_email=3, max_per_ip=100, backend=backend)
+    for _ in range(3):
+        assert await throttle.check("Client@example.com", "10.0.0.1") is None
+
+    retry_after = await throttle.check("client@example.com", "10.0.0.2")
+    assert 1 <= retry_after <= throttle.window_seconds
+    assert await throttle.check("other@example.com", "10.0.0.1") is None
+    assert throttle.stats()["throttled_email"] == 1
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_ip_budget(db, backend):
+    throttle = LoginThrottle(max_per_email=100, max_per_ip=2, backend=backend)
+    assert await throttle.check("a@example.com", "10.0.0.1") is None
+    assert await throttle.check("b@example.com", "10.0.0.1") is None
+    assert await throttle.check("c@example.com", "10.0.0.1") is not None
+    assert await throttle.check("c@example.com", "10.0.0.2") is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_successful_logins_do_not_count(db, backend):
+    throttle = LoginThrottle(max_per_email=2, max_per_ip=100, backend=backend)
+    for _ in range(5):
+        assert await throttle.check("client@example.com", "10.0.0.1") is None
+        await throttle.release("client@example.com", "10.0.0.1")
+    assert await throttle.check("client@example.com", "10.0.0.1") is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_rejected_attempts_do_not_extend_lockout(db, backend):
+    throttle = LoginThrottle(max_per_email=2, max_per_ip=3, backend=backend)
+    for _ in range(2):
+        await throttle.check("client@example.com", "10.0.0.1")
+    for _ in range(5):
+        assert await throttle.check("client@example.com", "10.0.0.1") is not None
+    # The rejected tries were not charged to the IP either
+    assert await throttle.check("other@example.com", "10.0.0.1") is None
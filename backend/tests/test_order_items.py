@@ -0,0 +1,49 @@
+"""Batched cart operations applied to an item list"""
+import pytest
+from fastapi import HTTPException
+from models.order import OrderItemOperation
+from services.order_items import apply_operations, embedded_item
+
+SERVICES = {"svc_page": ("Landing Page", 100.0)}
+PACKAGES = {"pkg_brand": ("Brand Kit", 250.0)}
+
+
+def ops(*operations) -> list:
+    return [OrderItemOperation(**operation) for operation in operations]
+
+
+def test_operations_apply_in_order():
+    page = embedded_item("svc_page", None, "Landing Page", 1, 100.0)
+    items = apply_operations([page], ops(
+        {"op": "add", "package_id": "pkg_brand", "quantity": 2},
+        {"op": "set_quantity", "item_id": str(page["_id"]), "quantity": 3},
+        {"op": "add", "service_id": "svc_page"}
+    ), SERVICES, PACKAGES)
+
+    assert [(i["service_id"], i["package_id"], i["quantity"], i["line_total"]) for i in items] == [
+        ("svc_page", None, 3, 300.0),
+        (None, "pkg_brand", 2, 500.0),
+        ("svc_page", None, 1, 100.0)
+    ]
+    assert items[1]["package_name"] == "Brand Kit"
+
+
+def test_input_items_are_not_modified():
+    page = embedded_item("svc_page", None, "Landing Page", 1, 100.0)
+    apply_operations([page], ops(
+        {"op": "set_quantity", "item_id": str(page["_id"]), "quantity": 4}
+    ), SERVICES, PACKAGES)
+    assert page["quantity"] == 1
+
+
+@pytest.mark.parametrize("operation, status_code", [
+    ({"op": "add", "service_id": "svc_missing"}, 404),
+    ({"op": "add", "package_id": "pkg_missing"}, 404),
+    ({"op": "add"}, 400),
+    ({"op": "remove", "item_id": "000000000000000000000000"}, 404)
+])
+def test_invalid_operation_fails_the_whole_batch(operation, status_code):
+    page = embedded_item("svc_page", None, "Landing Page", 1, 100.0)
+    with pytest.raises(HTTPException) as raised:
+        apply_operations([page], ops({"op": "remove", "item_id": str(page["_id"])}, operation), SERVICES, PACKAGES)
+    assert raised.value.status_code == status_code
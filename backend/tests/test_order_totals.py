@@ -0,0 +1,80 @@
+"""Order totals with a coupon applied, in both item storage modes"""
+import pytest
+from bson import ObjectId
+from config.settings import settings
+from models.order import OrderCreate, OrderItemCreate, ApplyCouponRequest, OrderItemBatch
+from routes import orders
+
+pytestmark = pytest.mark.anyio
+
+MODES = [pytest.param(True, id="embedded"), pytest.param(False, id="legacy")]
+
+
+@pytest.fixture
+async def shop(db):
+    user = {"id": str(ObjectId()), "email": "client@example.com", "name": "Client", "role": "client"}
+    services = await db.services.insert_many([
+        {"name": "Landing Page", "base_price": 100.0, "active": True},
+        {"name": "Logo", "base_price": 50.0, "active": True}
+    ])
+    await db.coupons.insert_many([
+        {"code": "TENOFF", "type": "percent", "value": 10, "active": True},
+        {"code": "FLAT30", "type": "fixed", "value": 30, "active": True}
+    ])
+    return user, [str(i) for i in services.inserted_ids]
+
+
+async def stored_order(db, order_id: str) -> dict:
+    return await db.orders.find_one({"_id": ObjectId(order_id)})
+
+
+@pytest.mark.parametrize("embedded", MODES)
+async def test_percent_coupon_follows_item_changes(db, shop, monkeypatch, embedded):
+    monkeypatch.setattr(settings, "ORDER_ITEMS_EMBEDDED", embedded)
+    user, (page, logo) = shop
+
+    order = await orders.create_order(OrderCreate(items=[OrderItemCreate(service_id=page)]), user)
+    applied = await orders.apply_coupon(order.id, ApplyCouponRequest(code="tenoff"), user)
+    assert applied["new_total"] == 90.0
+
+    order = await orders.add_order_item(order.id, OrderItemCreate(service_id=logo), user)
+    assert order.total == 135.0
+    doc = await stored_order(db, order.id)
+    assert (doc["subtotal"], doc["discount"], doc["total"]) == (150.0, 15.0, 135.0)
+
+    page_item = next(item for item in order.items if item.service_id == page)
+    await orders.remove_order_item(order.id, page_item.id, user)
+    doc = await stored_order(db, order.id)
+    assert (doc["subtotal"], doc["discount"], doc["total"]) == (50.0, 5.0, 45.0)
+    assert doc["coupon_code"] == "TENOFF"
+
+
+@pytest.mark.parametrize("embedded", MODES)
+async def test_fixed_coupon_is_capped_by_new_subtotal(db, shop, monkeypatch, embedded):
+    monkeypatch.setattr(settings, "ORDER_ITEMS_EMBEDDED", embedded)
+    user, (page, logo) = shop
+
+    order = await orders.create_order(OrderCreate(items=[OrderItemCreate(service_id=page)]), user)
+    await orders.apply_coupon(order.id, ApplyCouponRequest(code="FLAT30"), user)
+    order = await orders.batch_order_items(order.id, OrderItemBatch(operations=[
+        {"op": "remove", "item_id": order.items[0].id},
+        {"op": "add", "service_id": logo, "quantity": 1}
+    ]), user)
+    doc = await stored_order(db, order.id)
+    assert (doc["subtotal"], doc["discount"], doc["total"]) == (50.0, 30.0, 20.0)
+
+
+@pytest.mark.parametrize("embedded", MODES)
+async def test_coupon_dropped_once_no_longer_valid(db, shop, monkeypatch, embedded):
+    monkeypatch.setattr(settings, "ORDER_ITEMS_EMBEDDED", embedded)
+    user, (page, logo) = shop
+
+    order = await orders.create_order(OrderCreate(items=[OrderItemCreate(service_id=page)]), user)
+    await orders.apply_coupon(order.id, ApplyCouponRequest(code="TENOFF"), user)
+    await db.coupons.update_one({"code": "TENOFF"}, {"$set": {"active": False}})
+    from services.coupon_cache import coupon_cache
+    coupon_cache.clear()
+
+    await orders.add_order_item(order.id, OrderItemCreate(service_id=logo), user)
+    doc = await stored_order(db, order.id)
+    assert (doc["subtotal"], doc["discount"], doc["total"], doc["coupon_code"]) == (150.0, 0, 150.0, None)
@@ -0,0 +1,71 @@
+"""Keyset pagination across page boundaries"""
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException, Response
+from services.pagination import paginate, NEXT_CURSOR_HEADER
+
+pytestmark = pytest.mark.anyio
+
+
+async def all_pages(
+    collection, limit: int, direction: int = -1, query: dict = None, sort_key: str = "created_at"
+) -> list:
+    pages, cursor = [], None
+    while True:
+        response = Response()
+        docs = await paginate(collection, query or {}, sort_key, direction, limit, cursor, response)
+        pages.append([doc["n"] for doc in docs])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+async def messages(db):
+    start = datetime(2024, 1, 1)
+    # Pairs share a timestamp, so pages regularly split between equal sort keys
+    await db.messages.insert_many([
+        {"n": n, "created_at": start + timedelta(minutes=n // 2), "project": n % 3} for n in range(10)
+    ])
+    return db.messages
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 5, 10, 11])
+async def test_every_document_once_in_order(messages, limit):
+    pages = await all_pages(messages, limit, direction=1)
+    seen = [n for page in pages for n in page]
+    assert seen == list(range(10))
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+async def test_descending_pages(messages):
+    pages = await all_pages(messages, 4, direction=-1)
+    assert [n for page in pages for n in page] == [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+
+
+async def test_exact_multiple_has_no_empty_last_page(messages):
+    pages = await all_pages(messages, 5, direction=1)
+    assert pages == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+
+
+async def test_cursor_combines_with_query(messages):
+    pages = await all_pages(messages, 2, direction=1, query={"project": 0})
+    assert pages == [[0, 3], [6, 9]]
+
+
+async def test_invalid_cursor_is_rejected(messages):
+    with pytest.raises(HTTPException) as raised:
+        await paginate(messages, {}, "created_at", 1, 5, "not-a-cursor", Response())
+    assert raised.value.status_code == 400
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_documents_missing_the_sort_field(db, direction):
+    # Portfolio items may lack order_index; Mongo sorts them first
+    await db.portfolio.insert_many(
+        [{"n": n} for n in range(3)] + [{"n": n, "order_index": None} for n in range(3, 5)]
+        + [{"n": n, "order_index": n // 2} for n in range(5, 10)]
+    )
+    pages = await all_pages(db.portfolio, 2, direction, sort_key="order_index")
+    seen = [n for page in pages for n in page]
+    assert seen == (list(range(10)) if direction > 0 else [9, 8, 7, 6, 5, 4, 3, 2, 1, 0])
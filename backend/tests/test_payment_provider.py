@@ -0,0 +1,54 @@
+"""Payment provider plumbing"""
+import json
+import pytest
+import requests
+from services.payment_provider import configure_stripe_http
+
+
+@pytest.fixture
+def stripe(monkeypatch):
+    stripe = pytest.importorskip("stripe")
+    # configure_stripe_http changes SDK-wide defaults; put them back afterwards
+    monkeypatch.setattr(stripe, "default_http_client", None)
+    monkeypatch.setattr(stripe, "max_network_retries", stripe.max_network_retries)
+    return stripe
+
+
+def test_stripe_requests_go_through_the_pool(stripe, monkeypatch):
+    http_client = configure_stripe_http(timeout_seconds=7, max_retries=3, pool_size=5)
+    assert stripe.default_http_client is http_client
+    assert stripe.max_network_retries == 3
+
+    adapter = http_client._session.get_adapter("https://api.stripe.com/")
+    sent = []
+
+    def send(request, **kwargs):
+        sent.append((request.url, kwargs["timeout"]))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"id": "cs_test_1", "object": "checkout.session", "payment_status": "paid"}).encode()
+        response.headers["Content-Type"] = "application/json"
+        response.request = request
+        return response
+
+    monkeypatch.setattr(adapter, "send", send)
+    for _ in range(2):
+        session = stripe.checkout.Session.retrieve("cs_test_1", api_key="sk_test_pooling")
+        assert session.payment_status == "paid"
+
+    assert [url for url, _ in sent] == ["https://api.stripe.com/v1/checkout/sessions/cs_test_1"] * 2
+    assert all(timeout == 7 for _, timeout in sent)
+    assert adapter._pool_maxsize == 5
+
+
+def test_stripe_checkout_clients_are_bounded(stripe):
+    pytest.importorskip("emergentintegrations.payments.stripe.checkout")
+    from services.payment_provider import StripeProvider, MAX_CLIENTS
+
+    provider = StripeProvider(api_key="sk_test_pooling")
+    first = provider._client("http://localhost:8001/api/webhook/stripe")
+    assert provider._client("http://localhost:8001/api/webhook/stripe") is first
+    for i in range(MAX_CLIENTS * 2):
+        provider._client(f"http://host-{i}/api/webhook/stripe")
+    assert len(provider._clients) == MAX_CLIENTS
+    assert stripe.default_http_client is provider._http_client
@@ -0,0 +1,119 @@
+"""Payment finalization and reconciliation of open transactions"""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from models.order import OrderStatus
+from models.payment import PaymentStatus
+from routes import payments
+from services.email_service import email_service
+from services.payment_provider import ProviderError, SessionNotFound
+from services.payment_sweeper import PaymentSweeper
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def emails(monkeypatch):
+    sent = []
+
+    async def send_payment_confirmation(to_email, order_id, amount):
+        sent.append((to_email, order_id))
+        return True
+
+    monkeypatch.setattr(email_service, "send_payment_confirmation", send_payment_confirmation)
+    return sent
+
+
+async def open_transaction(db, session_id: str, age: timedelta = timedelta(0)) -> str:
+    user_id = ObjectId()
+    await db.users.insert_one({"_id": user_id, "email": "client@example.com", "name": "Client"})
+    order = await db.orders.insert_one({"user_id": user_id, "status": OrderStatus.PENDING, "total": 100.0})
+    order_id = str(order.inserted_id)
+    await db.payment_transactions.insert_one({
+        "order_id": order_id,
+        "amount": 100.0,
+        "currency": "usd",
+        "session_id": session_id,
+        "status": PaymentStatus.INITIATED,
+        "payment_status": "initiated",
+        "created_at": datetime.utcnow() - age
+    })
+    return order_id
+
+
+async def test_finalize_twice_runs_side_effects_once(db, emails):
+    order_id = await open_transaction(db, "cs_1")
+
+    assert await payments.finalize_payment(db, "cs_1") is True
+    assert await payments.finalize_payment(db, "cs_1") is False
+
+    assert len(emails) == 1
+    assert (await db.orders.find_one({"_id": ObjectId(order_id)}))["status"] == OrderStatus.PAID
+    assert await db.projects.count_documents({"order_id": order_id}) == 1
+    transaction = await db.payment_transactions.find_one({"session_id": "cs_1"})
+    assert transaction["status"] == PaymentStatus.PAID
+    assert "fulfilled_at" in transaction
+
+
+async def test_concurrent_finalize_has_one_winner(db, emails):
+    await open_transaction(db, "cs_1")
+
+    results = await asyncio.gather(*[payments.finalize_payment(db, "cs_1") for _ in range(5)])
+    assert sorted(results) == [False] * 4 + [True]
+    assert len(emails) == 1
+
+
+async def test_webhook_after_status_poll_does_not_refulfill(db, emails):
+    await open_transaction(db, "cs_1")
+    await payments.finalize_payment(db, "cs_1")
+
+    await payments.process_webhook_event({"data": {"session_id": "cs_1", "payment_status": "paid"}})
+    assert len(emails) == 1
+
+
+async def test_sweeper_backs_off_failing_transactions(db):
+    for i in range(3):
+        await open_transaction(db, f"cs_{i}", age=timedelta(hours=1, seconds=-i))
+    checked = []
+
+    async def reconcile(transaction):
+        checked.append(transaction["session_id"])
+        if transaction["session_id"] == "cs_0":
+            raise ProviderError("provider down")
+        return {"status": "open", "payment_status": "unpaid"}
+
+    sweeper = PaymentSweeper(interval_seconds=60, stale_seconds=600, batch_size=1, rate_per_second=1000)
+    sweeper._reconcile = reconcile
+    reports = [await sweeper.sweep() for _ in range(3)]
+
+    # The failing oldest transaction no longer blocks the ones behind it
+    assert checked == ["cs_0", "cs_1", "cs_1"]
+    assert [r["errors"] for r in reports] == [1, 0, 0]
+    failed = await db.payment_transactions.find_one({"session_id": "cs_0"})
+    assert failed["reconcile_attempts"] == 1
+    assert failed["next_check_at"] > datetime.utcnow() + timedelta(seconds=50)
+
+    # Due again: a second failure doubles the wait
+    await db.payment_transactions.update_one({"session_id": "cs_0"}, {"$set": {"next_check_at": datetime.utcnow()}})
+    await sweeper.sweep()
+    failed = await db.payment_transactions.find_one({"session_id": "cs_0"})
+    assert failed["reconcile_attempts"] == 2
+    assert failed["next_check_at"] > datetime.utcnow() + timedelta(seconds=110)
+
+
+async def test_unknown_session_is_expired(db, monkeypatch):
+    await open_transaction(db, "cs_gone", age=timedelta(hours=1))
+
+    async def refresh_checkout_status(db, transaction, webhook_url):
+        raise SessionNotFound("No such checkout session: cs_gone")
+
+    monkeypatch.setattr(payments, "refresh_checkout_status", refresh_checkout_status)
+    sweeper = PaymentSweeper(stale_seconds=600, rate_per_second=1000)
+    sweeper._reconcile = payments.reconcile_transaction
+    report = await sweeper.sweep()
+
+    assert (report["expired"], report["errors"]) == (1, 0)
+    transaction = await db.payment_transactions.find_one({"session_id": "cs_gone"})
+    assert transaction["status"] == PaymentStatus.EXPIRED
+    assert (await sweeper.sweep())["backlog"] == 0
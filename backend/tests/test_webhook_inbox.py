@@ -0,0 +1,91 @@
+"""Webhook inbox claims, retries and lease expiry"""
+from datetime import datetime, timedelta
+import pytest
+from services.webhook_inbox import WebhookInbox, PENDING, PROCESSING, DONE, DEAD
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def inbox(db):
+    inbox = WebhookInbox(max_attempts=2, retry_base_seconds=5, lease_seconds=60)
+    inbox.handled = []
+
+    async def handler(event):
+        inbox.handled.append(event["_id"])
+        if event["data"].get("fail"):
+            raise RuntimeError("handler failed")
+
+    inbox._handler = handler
+    return inbox
+
+
+async def run_once(inbox, db) -> bool:
+    event = await inbox._claim(db)
+    if event is None:
+        return False
+    await inbox._process(db, event)
+    return True
+
+
+async def test_redelivery_is_dropped(db, inbox):
+    assert await inbox.record("evt_1", "checkout.session.completed", {}, "{}") is True
+    assert await inbox.record("evt_1", "checkout.session.completed", {}, "{}") is False
+    assert await db.webhook_events.count_documents({}) == 1
+
+
+async def test_claimed_event_is_leased(db, inbox):
+    await inbox.record("evt_1", "checkout.session.completed", {}, "{}")
+    event = await inbox._claim(db)
+    assert event["status"] == PROCESSING
+    assert event["attempts"] == 1
+
+    # Another worker finds nothing while the lease holds
+    assert await inbox._claim(db) is None
+
+    # The worker died: once the lease runs out the event is claimable again
+    await db.webhook_events.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}})
+    retaken = await inbox._claim(db)
+    assert retaken["attempts"] == 2
+
+    # The late first worker cannot settle an event it no longer holds
+    await inbox._process(db, event)
+    assert (await db.webhook_events.find_one({"_id": "evt_1"}))["status"] == PROCESSING
+    await inbox._process(db, retaken)
+    assert (await db.webhook_events.find_one({"_id": "evt_1"}))["status"] == DONE
+
+
+async def test_failures_retry_then_dead_letter(db, inbox):
+    await inbox.record("evt_1", "checkout.session.completed", {"fail": True}, "{}")
+
+    assert await run_once(inbox, db)
+    stored = await db.webhook_events.find_one({"_id": "evt_1"})
+    assert stored["status"] == PENDING
+    assert stored["next_attempt_at"] > datetime.utcnow()
+    assert not await run_once(inbox, db)
+
+    await db.webhook_events.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    assert await run_once(inbox, db)
+    stored = await db.webhook_events.find_one({"_id": "evt_1"})
+    assert (stored["status"], stored["attempts"]) == (DEAD, 2)
+    assert not await run_once(inbox, db)
+
+    assert await inbox.redrive("evt_1") is True
+    assert await run_once(inbox, db)
+    assert inbox.handled == ["evt_1"] * 3
+
+
+async def test_event_whose_last_lease_expires_is_dead_lettered(db, inbox):
+    await inbox.record("evt_1", "checkout.session.completed", {}, "{}")
+    for attempt in range(1, inbox.max_attempts + 1):
+        # The worker dies mid-event every time
+        event = await inbox._claim(db)
+        assert event["attempts"] == attempt
+        await db.webhook_events.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+    assert await inbox._claim(db) is None
+    await inbox._expire_leases(db)
+    stored = await db.webhook_events.find_one({"_id": "evt_1"})
+    assert (stored["status"], stored["attempts"]) == (DEAD, inbox.max_attempts)
+    assert inbox.dead_lettered == 1
+    assert inbox.handled == []
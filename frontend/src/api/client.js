@@ -9,7 +9,7 @@ class ApiClient {
     return localStorage.getItem('ccc_token');
   }
 
-  async request(endpoint, options = {}) {
+  async send(endpoint, options = {}) {
     const token = this.getToken();
     const headers = {
       'Content-Type': 'application/json',
@@ -30,9 +30,29 @@ class ApiClient {
       throw new Error(error.detail || error.message || 'Request failed');
     }
 
+    return response;
+  }
+
+  async request(endpoint, options = {}) {
+    const response = await this.send(endpoint, options);
     return response.json();
   }
 
+  // List endpoints return one page at a time and the next page's cursor in
+  // X-Next-Cursor; follow it to load the whole list
+  async requestAll(endpoint) {
+    const items = [];
+    let cursor = null;
+    do {
+      const separator = endpoint.includes('?') ? '&' : '?';
+      const url = cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint;
+      const response = await this.send(url);
+      items.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return items;
+  }
+
   // Auth
   async register(data) {
     return this.request('/api/auth/register', {
@@ -113,6 +133,13 @@ class ApiClient {
     });
   }
 
+  async quoteOrder(items, couponCode = null) {
+    return this.request('/api/orders/quote', {
+      method: 'POST',
+      body: JSON.stringify({ items, coupon_code: couponCode }),
+    });
+  }
+
   async addOrderItem(orderId, data) {
     return this.request(`/api/orders/${orderId}/items`, {
       method: 'POST',
@@ -120,13 +147,20 @@ class ApiClient {
     });
   }
 
+  async batchOrderItems(orderId, operations) {
+    return this.request(`/api/orders/${orderId}/items/batch`, {
+      method: 'POST',
+      body: JSON.stringify({ operations }),
+    });
+  }
+
   async getOrder(id) {
     return this.request(`/api/orders/${id}`);
   }
 
   async getOrders(status = null) {
     const params = status ? `?status=${status}` : '';
-    return this.request(`/api/orders${params}`);
+    return this.requestAll(`/api/orders${params}`);
   }
 
   async updateOrder(id, data) {
@@ -155,8 +189,13 @@ class ApiClient {
     return this.request(`/api/payments/checkout-status/${sessionId}`);
   }
 
+  // Long-poll: resolves once the session is paid or expired, or after `timeout` seconds
+  async waitForCheckoutStatus(sessionId, timeout = 25) {
+    return this.request(`/api/payments/checkout-status/${sessionId}/wait?timeout=${timeout}`);
+  }
+
   async getPayments() {
-    return this.request('/api/payments');
+    return this.requestAll('/api/payments');
   }
 
   async refundPayment(paymentId) {
@@ -177,13 +216,13 @@ class ApiClient {
 
   async getIntakes(type = null) {
     const params = type ? `?type=${type}` : '';
-    return this.request(`/api/intake${params}`);
+    return this.requestAll(`/api/intake${params}`);
   }
 
   // Projects
   async getProjects(status = null) {
     const params = status ? `?status=${status}` : '';
-    return this.request(`/api/projects${params}`);
+    return this.requestAll(`/api/projects${params}`);
   }
 
   async getProject(id) {
@@ -213,7 +252,7 @@ class ApiClient {
   }
 
   async getThreads() {
-    return this.request('/api/threads');
+    return this.requestAll('/api/threads');
   }
 
   async getThread(id) {
@@ -221,7 +260,7 @@ class ApiClient {
   }
 
   async getMessages(threadId) {
-    return this.request(`/api/threads/${threadId}/messages`);
+    return this.requestAll(`/api/threads/${threadId}/messages`);
   }
 
   async sendMessage(threadId, body, attachments = []) {
@@ -248,7 +287,7 @@ class ApiClient {
     if (projectId) params.append('project_id', projectId);
     if (orderId) params.append('order_id', orderId);
     const query = params.toString() ? `?${params.toString()}` : '';
-    return this.request(`/api/files${query}`);
+    return this.requestAll(`/api/files${query}`);
   }
 
   async deleteFile(id) {
@@ -257,7 +296,7 @@ class ApiClient {
 
   // Portfolio
   async getPortfolio() {
-    return this.request('/api/files/portfolio');
+    return this.requestAll('/api/files/portfolio');
   }
 
   async addPortfolioItem(data) {
@@ -284,7 +323,7 @@ class ApiClient {
     if (search) params.append('search', search);
     if (role) params.append('role', role);
     const query = params.toString() ? `?${params.toString()}` : '';
-    return this.request(`/api/admin/users${query}`);
+    return this.requestAll(`/api/admin/users${query}`);
   }
 
   async updateUserRole(userId, role) {
@@ -315,7 +354,7 @@ class ApiClient {
 
   // Get all clients (CCC Admin only)
   async getAllClients() {
-    return this.request('/api/client-projects/admin/clients');
+    return this.requestAll('/api/client-projects/admin/clients');
   }
 
   // Get a specific client's project (CCC Admin only)
@@ -367,7 +406,7 @@ class ApiClient {
 
   // Get project files
   async getProjectFiles(userId) {
-    return this.request(`/api/client-projects/files/${userId}`);
+    return this.requestAll(`/api/client-projects/files/${userId}`);
   }
 
   // Delete project file
@@ -12,8 +12,9 @@ export default function PaymentSuccess() {
 
   useEffect(() => {
     const pollStatus = async (attempts = 0) => {
-      const maxAttempts = 5;
-      const pollInterval = 2000;
+      // Each attempt is a server-side long-poll of up to 25 s
+      const maxAttempts = 3;
+      const retryDelay = 2000;
 
       if (attempts >= maxAttempts) {
         setStatus('timeout');
@@ -21,7 +22,7 @@ export default function PaymentSuccess() {
       }
 
       try {
-        const result = await api.getCheckoutStatus(sessionId);
+        const result = await api.waitForCheckoutStatus(sessionId);
         setPaymentInfo(result);
 
         if (result.payment_status === 'paid') {
@@ -33,11 +34,11 @@ export default function PaymentSuccess() {
           return;
         }
 
-        setTimeout(() => pollStatus(attempts + 1), pollInterval);
+        pollStatus(attempts + 1);
       } catch (error) {
         console.error('Error checking status:', error);
         if (attempts < maxAttempts - 1) {
-          setTimeout(() => pollStatus(attempts + 1), pollInterval);
+          setTimeout(() => pollStatus(attempts + 1), retryDelay);
         } else {
           setStatus('error');
         }
@@ -10,6 +10,8 @@ export default function PortalOrderDetail() {
   const [order, setOrder] = useState(null);
   const [loading, setLoading] = useState(true);
   const [paying, setPaying] = useState(false);
+  const [quantities, setQuantities] = useState({});
+  const [saving, setSaving] = useState(false);
 
   useEffect(() => {
     fetchOrder();
@@ -53,6 +55,26 @@ export default function PortalOrderDetail() {
     }
   };
 
+  // All quantity changes go to the server as one batch
+  const handleSaveQuantities = async () => {
+    const operations = order.items
+      .filter(item => quantities[item.id] !== undefined && quantities[item.id] !== item.quantity)
+      .map(item => ({ op: 'set_quantity', item_id: item.id, quantity: quantities[item.id] }));
+    if (operations.length === 0) return;
+
+    setSaving(true);
+    try {
+      const updated = await api.batchOrderItems(order.id, operations);
+      setOrder(updated);
+      setQuantities({});
+      toast.success('Order updated');
+    } catch (error) {
+      toast.error(error.message || 'Failed to update order');
+    } finally {
+      setSaving(false);
+    }
+  };
+
   const handleCancel = async () => {
     if (!window.confirm('Are you sure you want to cancel this order?')) return;
     try {
@@ -89,6 +111,9 @@ export default function PortalOrderDetail() {
 
   const canPay = order.status === 'draft' || order.status === 'pending';
   const canModify = order.status === 'draft';
+  const hasQuantityChanges = order.items?.some(
+    item => quantities[item.id] !== undefined && quantities[item.id] !== item.quantity
+  );
 
   return (
     <div className="p-8">
@@ -160,6 +185,19 @@ export default function PortalOrderDetail() {
                       </p>
                     </div>
                     <div className="flex items-center gap-6">
+                      {canModify && (
+                        <input
+                          type="number"
+                          min="1"
+                          value={quantities[item.id] ?? item.quantity}
+                          onChange={(e) => setQuantities({
+                            ...quantities,
+                            [item.id]: Math.max(1, parseInt(e.target.value, 10) || 1)
+                          })}
+                          className="input-box w-20"
+                          data-testid={`quantity-${item.id}`}
+                        />
+                      )}
                       <div className="text-right">
                         <p className="text-lg font-bold">${item.line_total?.toFixed(2)}</p>
                         <p className="text-xs text-slate-500">${item.unit_price?.toFixed(2)} each</p>
@@ -176,6 +214,21 @@ export default function PortalOrderDetail() {
                     </div>
                   </div>
                 ))}
+                {canModify && hasQuantityChanges && (
+                  <div className="p-6 flex justify-end gap-4">
+                    <button onClick={() => setQuantities({})} className="btn-secondary">
+                      Discard
+                    </button>
+                    <button
+                      onClick={handleSaveQuantities}
+                      disabled={saving}
+                      className="btn-primary disabled:opacity-50"
+                      data-testid="save-quantities-btn"
+                    >
+                      {saving ? 'Saving...' : 'Save Changes'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
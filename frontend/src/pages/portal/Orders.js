@@ -5,6 +5,12 @@ import { Plus, ShoppingCart, ArrowRight, X, CreditCard } from 'lucide-react';
 import api from '../../api/client';
 import { toast } from 'sonner';
 
+const toOrderItems = (selectedItems) => selectedItems.map(item => ({
+  service_id: item.type === 'service' ? item.id : null,
+  package_id: item.type === 'package' ? item.id : null,
+  quantity: 1
+}));
+
 export default function PortalOrders() {
   const [orders, setOrders] = useState([]);
   const [services, setServices] = useState([]);
@@ -13,12 +19,26 @@ export default function PortalOrders() {
   const [showCreate, setShowCreate] = useState(false);
   const [selectedItems, setSelectedItems] = useState([]);
   const [creating, setCreating] = useState(false);
+  const [quote, setQuote] = useState(null);
   const navigate = useNavigate();
 
   useEffect(() => {
     fetchData();
   }, []);
 
+  // Price the selection on the server, so the preview matches the order that gets created
+  useEffect(() => {
+    if (selectedItems.length === 0) {
+      setQuote(null);
+      return;
+    }
+    let stale = false;
+    api.quoteOrder(toOrderItems(selectedItems))
+      .then(data => { if (!stale) setQuote(data); })
+      .catch(() => { if (!stale) setQuote(null); });
+    return () => { stale = true; };
+  }, [selectedItems]);
+
   const fetchData = async () => {
     try {
       const [ordersData, servicesData, packagesData] = await Promise.all([
@@ -44,17 +64,8 @@ export default function PortalOrders() {
 
     setCreating(true);
     try {
-      // Create order
-      const order = await api.createOrder({});
-      
-      // Add items
-      for (const item of selectedItems) {
-        await api.addOrderItem(order.id, {
-          service_id: item.type === 'service' ? item.id : null,
-          package_id: item.type === 'package' ? item.id : null,
-          quantity: 1
-        });
-      }
+      // Create order together with its items
+      const order = await api.createOrder({ items: toOrderItems(selectedItems) });
 
       toast.success('Order created!');
       setShowCreate(false);
@@ -273,8 +284,11 @@ export default function PortalOrders() {
               <div>
                 <p className="text-sm text-slate-500">Selected: {selectedItems.length} item(s)</p>
                 <p className="text-xl font-bold text-white">
-                  Total: ${selectedItems.reduce((sum, item) => sum + (item.base_price || item.price || 0), 0).toFixed(2)}
+                  Total: ${(quote ? quote.total : selectedItems.reduce((sum, item) => sum + (item.base_price || item.price || 0), 0)).toFixed(2)}
                 </p>
+                {quote?.tax > 0 && (
+                  <p className="text-xs text-slate-500">Includes ${quote.tax.toFixed(2)} tax</p>
+                )}
               </div>
               <div className="flex gap-4">
                 <button onClick={() => setShowCreate(false)} className="btn-secondary">